@@ -2,6 +2,8 @@
 ASGI config for Diplomska project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live updates stream (events/stream/) is only served through this app, e.g.
+``gunicorn Diplomska.asgi:application -k uvicorn_worker.UvicornWorker``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -38,15 +38,26 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'calendar_app',
     'friends',
     'groups',
     'events',
+    'jobs',
+    'monitoring',
     'cloudinary',
     'cloudinary_storage',
 ]
 
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+STORAGES = {
+    "default": {
+        "BACKEND": "monitoring.storage.MediaCloudinaryStorage",
+    },
+    # Hashed file names plus .gz/.br variants written at collectstatic time
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),
@@ -56,6 +67,10 @@ CLOUDINARY_STORAGE = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'monitoring.middleware.tracing_middleware',
+    'monitoring.middleware.metrics_middleware',
+    'monitoring.middleware.slow_query_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,7 +83,7 @@ ROOT_URLCONF = 'Diplomska.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'monitoring.template_backend.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -126,6 +141,14 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'calendar_app.CustomUser'
 
+# Username or email login, throttled per account and per IP (see calendar_app.throttle)
+AUTHENTICATION_BACKENDS = ['calendar_app.backends.EmailOrUsernameBackend']
+LOGIN_THROTTLE_WINDOW = 900
+LOGIN_THROTTLE_ACCOUNT_FAILURES = 5
+LOGIN_THROTTLE_IP_FAILURES = 50
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on Render)
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -146,19 +169,119 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# WhiteNoise serves hashed files as immutable for ten years and everything
+# else with its short default max-age, so unhashed files can still change
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are written here first and pushed to the file storage in the background
+UPLOAD_STAGING_ROOT = BASE_DIR / 'upload_staging'
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Sending is timed and counted for /metrics, the actual delivery is done by
+# EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'monitoring.mail.EmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
\ No newline at end of file
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Live updates (server-sent events, served by the ASGI app)
+# Use 'calendar_app.broker.PostgresBroker' when running more than one worker process
+LIVE_UPDATES_BROKER = os.environ.get("LIVE_UPDATES_BROKER", "calendar_app.broker.InMemoryBroker")
+LIVE_UPDATES_KEEPALIVE = 15
+LIVE_UPDATES_RETRY_MS = 5000
+
+# Background jobs (python manage.py run_jobs --concurrency N)
+# A running job not finished after JOBS_LOCK_TIMEOUT seconds is handed to another worker
+JOBS_LOCK_TIMEOUT = 600
+JOBS_MAX_ATTEMPTS = 5
+
+# Retention, run archive_events and purge_declined_invitations from a daily cron
+EVENT_ARCHIVE_AFTER_MONTHS = 12
+DECLINED_INVITATION_RETENTION_DAYS = 30
+
+# Event reminders are sent by a worker running python manage.py send_reminders
+# Notification digests, run send_digests hourly and send_digests daily from cron
+
+# Friend suggestions, rebuild nightly with compute_friend_suggestions
+FRIEND_SUGGESTIONS_PER_USER = 20
+
+# Delta sync (/api/sync/)
+SYNC_PAGE_SIZE = 200
+# Rows younger than this are left for the next call, so transactions that are
+# still committing with an older updated_at are not skipped by the cursor
+SYNC_SETTLE_SECONDS = 5
+# Tombstones are purged after this many days, older tokens need a full sync
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Hits and misses of every cache are counted for /metrics
+CACHES = {
+    'default': {
+        'BACKEND': 'monitoring.cache.LocMemCache',
+    },
+    # Rate limits of cheap, frequent requests (calendar_app.ratelimit), kept
+    # in each worker process without database queries. Every worker counts on
+    # its own, so a client spread over N workers gets up to N times the rate
+    'ratelimit': {
+        'BACKEND': 'monitoring.cache.LocMemCache',
+        'LOCATION': 'ratelimit',
+        'MAX_ENTRIES': 10000,
+        'METRICS_NAME': 'ratelimit',
+    },
+    # Login throttling and rate limits of expensive requests, shared by all
+    # workers. Every access is a database query, a write also counts the table
+    # to cull it. The table is created by the calendar_app migrations
+    'throttle': {
+        'BACKEND': 'monitoring.cache.DatabaseCache',
+        'LOCATION': 'calendar_throttle_cache',
+        'METRICS_NAME': 'throttle',
+    },
+    # Shared calendar pages and calendar versions (calendar_app.sharing), in a
+    # table of their own so culling pages never evicts throttle counters
+    'shared': {
+        'BACKEND': 'monitoring.cache.DatabaseCache',
+        'LOCATION': 'calendar_shared_cache',
+        'METRICS_NAME': 'shared',
+    },
+}
+
+# Public share links (/share/<token>/). Pages stay in the shared cache until the
+# calendar changes or for SHARE_CACHE_TIMEOUT seconds, browsers and proxies may
+# keep them for SHARE_MAX_AGE seconds. One request at a time rebuilds a page,
+# a rebuild that takes longer than SHARE_REBUILD_LOCK_SECONDS is given up on.
+# Requests without a previous version wait up to SHARE_REBUILD_WAIT_SECONDS
+# for the rebuild, then render the page themselves without caching it
+SHARE_CACHE_TIMEOUT = 3600
+SHARE_MAX_AGE = 60
+SHARE_REBUILD_LOCK_SECONDS = 10
+SHARE_REBUILD_WAIT_SECONDS = 1
+
+# Prometheus metrics (/metrics), scrape with "Authorization: Bearer <token>".
+# Under gunicorn the workers share PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Queries slower than this are kept (last SLOW_QUERY_LOG_SIZE per worker) and
+# shown at /admin/slow-queries/, a sample of them with EXPLAIN ANALYZE output
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN_RATE = 0.1
+SLOW_QUERY_LOG_SIZE = 100
+
+# Tracing, a TRACING_SAMPLE_RATE share of requests is traced together with the
+# jobs and uploads they start. Spans go to TRACING_EXPORTER:
+# 'monitoring.tracing.JsonLinesExporter' appends them to TRACING_JSONL_PATH,
+# 'monitoring.tracing.CollectorExporter' posts them to an OTLP/HTTP collector
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0))
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "monitoring.tracing.JsonLinesExporter")
+TRACING_JSONL_PATH = os.environ.get("TRACING_JSONL_PATH", BASE_DIR / 'traces.jsonl')
+TRACING_COLLECTOR_URL = os.environ.get("TRACING_COLLECTOR_URL", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = 'calendar'
@@ -19,11 +19,16 @@ from django.urls import path
 from django.urls import include
 from django.conf import settings
 from django.conf.urls.static import static
+from events import views as event_views
+from monitoring import views as monitoring_views
 
 urlpatterns = [
+    path('admin/slow-queries/', admin.site.admin_view(monitoring_views.slow_queries), name='slow_queries'),
     path('admin/', admin.site.urls),
     path('', include('calendar_app.urls')),
     path('friends/', include('friends.urls')),
     path('groups/', include('groups.urls')),
     path('events/', include('events.urls')),
+    path('api/sync/', event_views.sync_changes, name='sync_changes'),
+    path('metrics', monitoring_views.metrics, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,12 +1,102 @@
 from django.contrib import admin
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from calendar_app.models import CustomUser
-from events.models import Event, EventInvitation
+from events.models import Event, EventInvitation, SEARCH_CONFIG
 from friends.models import Friendship
 from groups.models import Group
+from jobs.models import Job
 
-admin.site.register(CustomUser)
-admin.site.register(Friendship)
-admin.site.register(Group)
-admin.site.register(Event)
-admin.site.register(EventInvitation)
\ No newline at end of file
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) on PostgreSQL reads the whole table, so unfiltered changelists
+    # of big tables use the planner's row estimate from pg_class instead
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            # reltuples is -1 until the table was first analyzed
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Filtered changelists would count the whole table a second time
+    show_full_result_count = False
+
+
+# Searches use lookups that the unique and db_index columns can serve, on
+# PostgreSQL those get an extra varchar_pattern_ops index for startswith
+@admin.register(CustomUser)
+class CustomUserAdmin(LargeTableAdmin):
+    list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff')
+    search_fields = ('username__startswith', 'email__startswith')
+    ordering = ('username',)
+    filter_horizontal = ('groups', 'user_permissions')
+
+
+@admin.register(Friendship)
+class FriendshipAdmin(LargeTableAdmin):
+    list_display = ('from_user', 'to_user', 'is_accepted')
+    list_select_related = ('from_user', 'to_user')
+    autocomplete_fields = ('from_user', 'to_user')
+    search_fields = ('from_user__username__startswith', 'to_user__username__startswith')
+
+
+@admin.register(Group)
+class GroupAdmin(LargeTableAdmin):
+    list_display = ('name', 'created_by')
+    autocomplete_fields = ('created_by', 'members')
+    search_fields = ('name__startswith',)
+
+    def get_queryset(self, request):
+        # __str__ shows the creator, also in autocomplete results
+        return super().get_queryset(request).select_related('created_by')
+
+
+@admin.register(Event)
+class EventAdmin(LargeTableAdmin):
+    list_display = ('title', 'created_by', 'start_time', 'end_time', 'visibility', 'accepted_count', 'pending_count')
+    list_filter = ('start_time',)
+    ordering = ('-start_time',)
+    autocomplete_fields = ('created_by', 'visible_to_friends', 'visible_to_groups')
+    search_fields = ('title',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('created_by')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Title and description through the search_vector GIN index
+        if search_term and connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(search_term, config=SEARCH_CONFIG, search_type='websearch')
+            return queryset.filter(search_vector=query), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(EventInvitation)
+class EventInvitationAdmin(LargeTableAdmin):
+    list_display = ('user', 'event', 'group', 'status', 'updated_at')
+    list_select_related = ('user', 'event__created_by', 'group__created_by')
+    list_filter = ('status', 'updated_at')
+    ordering = ('-updated_at', '-id')
+    autocomplete_fields = ('user', 'event', 'group')
+    search_fields = ('user__username__startswith',)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status',)
+    ordering = ('-id',)
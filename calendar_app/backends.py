@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from . import throttle
+
+UserModel = get_user_model()
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    # Logs in with the username or the email address, found with one query
+    # over their two unique indexes. A username that looks like somebody
+    # else's email address wins.
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        if throttle.is_throttled(request, username):
+            # authenticate() skips the remaining backends and sends user_login_failed
+            raise PermissionDenied
+
+        candidates = list(UserModel._default_manager.filter(Q(username=username) | Q(email=username))[:2])
+        user = next((u for u in candidates if u.username == username), candidates[0] if candidates else None)
+
+        if user is None:
+            # Hash anyway, so unknown accounts answer as slowly as wrong passwords
+            UserModel().set_password(password)
+            throttle.record_failure(request, username)
+            return None
+
+        # Failures through the account's other login string count too
+        if throttle.is_throttled(None, user.username):
+            raise PermissionDenied
+        if user.check_password(password) and self.user_can_authenticate(user):
+            throttle.reset(username, user.username)
+            return user
+
+        throttle.record_failure(request, username, user.username)
+        return None
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, user_id, max_size):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def deliver(self, notice):
+        # A client that stops reading loses its oldest notices, not the newest ones
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(notice)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class BaseBroker:
+    def publish(self, user_ids, notice):
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+# Fans notices out to the subscribers of the current process only
+class InMemoryBroker(BaseBroker):
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, user_ids, notice):
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscriptions.get(user_id, ())]
+
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, notice)
+            except RuntimeError:
+                # the loop of that connection is already closed
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, self.max_queue_size)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.user_id]
+
+
+# Shares notices between worker processes through LISTEN/NOTIFY. NOTIFY is
+# transactional, so a notice sent inside a transaction arrives after commit.
+class PostgresBroker(InMemoryBroker):
+    channel = 'calendar_live_updates'
+
+    def __init__(self, max_queue_size=100):
+        super().__init__(max_queue_size)
+        self._listener = None
+
+    def publish(self, user_ids, notice):
+        payload = json.dumps({'users': sorted(set(user_ids)), 'notice': notice})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='live-updates-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def _listen(self):
+        import psycopg2
+
+        params = connection.get_connection_params()
+        while True:
+            try:
+                listener = psycopg2.connect(**params)
+                listener.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with listener.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+
+                while True:
+                    if select.select([listener], [], [], 30) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        message = json.loads(listener.notifies.pop(0).payload)
+                        super().publish(message['users'], message['notice'])
+            except Exception:
+                logger.exception("Live updates listener lost its connection, reconnecting")
+                threading.Event().wait(5)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.LIVE_UPDATES_BROKER)()
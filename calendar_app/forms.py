@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from calendar_app.models import CustomUser
+from events.models import Event
 
 # Create your forms here.
 class RegisterForm(UserCreationForm):
@@ -19,4 +20,17 @@ class RegisterForm(UserCreationForm):
 
 class LoginForm(AuthenticationForm):
     username = forms.CharField()
-    password = forms.CharField(widget=forms.PasswordInput)
\ No newline at end of file
+    password = forms.CharField(widget=forms.PasswordInput)
+
+
+class NotificationSettingsForm(forms.ModelForm):
+    reminder_minutes = forms.TypedChoiceField(
+        choices=[('', 'No reminders')] + Event.REMINDER_CHOICES,
+        coerce=int,
+        empty_value=None,
+        required=False
+    )
+
+    class Meta:
+        model = CustomUser
+        fields = ['notification_frequency', 'reminder_minutes']
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from calendar_app.uploads import staged_uploads, upload_staged_profile_picture
+
+
+class Command(BaseCommand):
+    help = "Uploads profile pictures that are still staged on local disk (e.g. after a restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=600,
+                            help="Only pick up files staged at least this many seconds ago.")
+
+    def handle(self, *args, **options):
+        uploaded = 0
+        for user_id, path in staged_uploads(older_than=options['older_than']):
+            try:
+                upload_staged_profile_picture(user_id, path)
+                uploaded += 1
+            except Exception as e:
+                self.stderr.write(f"Could not upload {path}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Uploaded {uploaded} staged profile picture(s)."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0005_remove_eventinvitation_event_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='reminder_minutes',
+            field=models.PositiveIntegerField(blank=True, default=30, null=True),
+        ),
+    ]
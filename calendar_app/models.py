@@ -4,6 +4,12 @@ from django.conf import settings
 
 # Create your models here.
 class CustomUser(AbstractUser):
+    NOTIFICATION_CHOICES = [
+        ('immediate', 'Immediately'),
+        ('hourly', 'Hourly digest'),
+        ('daily', 'Daily digest'),
+    ]
+
     email = models.EmailField(unique=True)
     birthday = models.DateField(null=False, blank=False)
     gender = models.CharField(
@@ -17,6 +23,10 @@ class CustomUser(AbstractUser):
         null=True,
         blank=True,
     )
+    # Default lead time of event reminders, None turns them off
+    reminder_minutes = models.PositiveIntegerField(null=True, blank=True, default=30)
+    # Invitation and reschedule emails, the digests are sent by send_digests
+    notification_frequency = models.CharField(max_length=10, choices=NOTIFICATION_CHOICES, default='immediate')
 
     def __str__(self):
         return self.first_name + ' ' + self.last_name
@@ -24,4 +34,14 @@ class CustomUser(AbstractUser):
     def get_profile_picture(self):
         if self.profile_picture and hasattr(self.profile_picture, 'url'):
             return self.profile_picture.url
-        return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/profile_pics/default_lqscna.jpg"
\ No newline at end of file
+        return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/profile_pics/default_lqscna.jpg"
+
+# A public link to the public events of a user's calendar, the URL carries the
+# signed id (see calendar_app.sharing) and deleting the row revokes it
+class ShareLink(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='share_links')
+    label = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.label or self.id}"
@@ -0,0 +1,58 @@
+import math
+import time
+from functools import wraps
+from django.core.cache import caches
+from django.http import HttpResponse
+from .throttle import client_ip
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _client(request, key):
+    if key == 'user' and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def _take_token(cache, cache_key, per_second, capacity):
+    # Returns 0 when a token was taken, otherwise the seconds until the next
+    # one. Concurrent requests of one client can both read the same bucket,
+    # so a burst may exceed the limit by a request or two.
+    now = time.time()
+    tokens, updated = cache.get(cache_key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens < 1:
+        return (1 - tokens) / per_second
+
+    # A bucket left alone until it is full again is the same as no bucket
+    cache.set(cache_key, (tokens - 1, now), timeout=math.ceil(capacity / per_second))
+    return 0
+
+
+def ratelimit(rate, burst=None, key='user', methods=None, cache='throttle'):
+    # Token bucket per view and client: up to burst requests at once (the
+    # count of rate by default), refilled at rate, e.g. '30/m'. key='user'
+    # buckets logged in users by id and everybody else by IP, key='ip' always
+    # by IP. Goes below @login_required. Requests over the limit get a 429.
+    # The 'throttle' cache costs about four queries per request but holds for
+    # all workers, cache='ratelimit' costs none and holds per worker.
+    count, period = rate.split('/')
+    per_second = int(count) / _PERIODS[period[0]]
+    capacity = burst or int(count)
+
+    def decorator(view):
+        scope = f"{view.__module__}.{view.__qualname__}"
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = _take_token(caches[cache], f"ratelimit:{scope}:{_client(request, key)}", per_second, capacity)
+                if retry_after:
+                    response = HttpResponse("Too many requests, please slow down.", status=429, content_type='text/plain')
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
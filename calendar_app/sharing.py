@@ -0,0 +1,91 @@
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from .models import ShareLink
+
+# Share pages are cached per user and week under the user's calendar
+# version, a random token replaced whenever something on their calendar
+# changes (events.signals). A version lost from the cache is replaced by a
+# new one too, so a page is never served under the wrong version.
+
+SALT = 'calendar_app.share'
+
+
+def share_token(link):
+    return signing.dumps(link.id, salt=SALT)
+
+
+def link_for_token(token):
+    try:
+        link_id = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+    return ShareLink.objects.select_related('user').filter(id=link_id).first()
+
+
+def _version_key(user_id):
+    return f"share-version:{user_id}"
+
+
+def calendar_version(user_id):
+    cache = caches['shared']
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def _bump_versions(user_ids):
+    # Only users with a share link have pages to invalidate, one query keeps
+    # the cache writes off the path of everybody else's events. Creating a
+    # link bumps the version, so pages from an earlier link are not reused.
+    owners = set(ShareLink.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    if owners:
+        caches['shared'].set_many({_version_key(user_id): uuid.uuid4().hex for user_id in owners}, None)
+
+
+def calendars_changed(user_ids):
+    # After the commit, so a rebuild never caches the old rows under the new
+    # version. Robust, a cache outage must not fail the write that was committed.
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: _bump_versions(user_ids), robust=True)
+
+
+def cached_page(key, latest_key, build):
+    # The page under key, built by build() if missing. Only one request at a
+    # time rebuilds it, the others meanwhile get the previous version
+    # (latest_key) or, without one, wait briefly for the rebuild and then
+    # render the page themselves without caching it.
+    cache = caches['shared']
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    lock = f"{key}:rebuild"
+    if not cache.add(lock, True, settings.SHARE_REBUILD_LOCK_SECONDS):
+        page = cache.get(latest_key)
+        if page is not None:
+            return page
+        deadline = time.monotonic() + settings.SHARE_REBUILD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            page = cache.get(key)
+            if page is not None:
+                return page
+        return build()
+
+    try:
+        # Built by a lock holder that finished just before we took the lock
+        page = cache.get(key)
+        if page is None:
+            page = build()
+            cache.set_many({key: page, latest_key: page}, settings.SHARE_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock)
+    return page
@@ -1,3 +1,180 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from calendar_app.models import CustomUser
+from events.models import Event, EventInvitation
 
 # Create your tests here.
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'login-tests'},
+    },
+    LOGIN_THROTTLE_ACCOUNT_FAILURES=3,
+    LOGIN_THROTTLE_IP_FAILURES=5,
+    TRUSTED_PROXY_COUNT=0,
+)
+class EmailOrUsernameBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user(
+            username='alice', email='alice@example.com', password='secret',
+            birthday=date(2000, 1, 1), gender='Other',
+        )
+
+    def setUp(self):
+        caches['throttle'].clear()
+
+    def authenticate(self, username, password, ip='10.0.0.1'):
+        request = RequestFactory().post('/login/', REMOTE_ADDR=ip)
+        return authenticate(request, username=username, password=password)
+
+    def count_hashes(self):
+        return mock.patch.object(MD5PasswordHasher, 'encode', autospec=True, side_effect=MD5PasswordHasher.encode)
+
+    def test_username_login_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate('alice', 'secret'), self.alice)
+
+    def test_email_login_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate('alice@example.com', 'secret'), self.alice)
+
+    def test_username_wins_over_email(self):
+        other = CustomUser.objects.create_user(
+            username='alice@example.com', email='other@example.com', password='other',
+            birthday=date(2000, 1, 1), gender='Other',
+        )
+        self.assertEqual(self.authenticate('alice@example.com', 'other'), other)
+        self.assertIsNone(self.authenticate('alice@example.com', 'secret'))
+
+    def test_unknown_user_costs_the_same_as_a_wrong_password(self):
+        with self.count_hashes() as unknown, self.assertNumQueries(1):
+            self.assertIsNone(self.authenticate('nobody', 'secret'))
+        with self.count_hashes() as wrong, self.assertNumQueries(1):
+            self.assertIsNone(self.authenticate('alice', 'wrong'))
+        self.assertEqual(unknown.call_count, 1)
+        self.assertEqual(wrong.call_count, 1)
+
+    def test_throttled_account_is_refused_before_hashing(self):
+        for _ in range(3):
+            self.assertIsNone(self.authenticate('alice', 'wrong'))
+
+        with self.count_hashes() as hashes, self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate('alice', 'secret'))
+        self.assertEqual(hashes.call_count, 0)
+
+        # Other accounts from another address are not affected
+        self.assertIsNone(self.authenticate('bob', 'wrong', ip='10.0.0.2'))
+
+    def test_throttled_ip_is_refused_for_every_account(self):
+        for i in range(5):
+            self.assertIsNone(self.authenticate(f'user{i}', 'wrong'))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.authenticate('alice', 'secret'))
+        self.assertEqual(self.authenticate('alice', 'secret', ip='10.0.0.2'), self.alice)
+
+    def test_username_and_email_share_the_account_count(self):
+        self.assertIsNone(self.authenticate('alice', 'wrong'))
+        self.assertIsNone(self.authenticate('alice@example.com', 'wrong', ip='10.0.0.2'))
+        self.assertIsNone(self.authenticate('Alice', 'wrong', ip='10.0.0.3'))
+
+        with self.count_hashes() as hashes:
+            self.assertIsNone(self.authenticate('alice@example.com', 'secret', ip='10.0.0.4'))
+            self.assertIsNone(self.authenticate('alice', 'secret', ip='10.0.0.4'))
+        self.assertEqual(hashes.call_count, 0)
+
+    def test_successful_login_resets_the_account_count(self):
+        for _ in range(2):
+            self.authenticate('alice', 'wrong')
+        self.assertEqual(self.authenticate('alice', 'secret'), self.alice)
+        for _ in range(2):
+            self.authenticate('alice', 'wrong', ip='10.0.0.2')
+        self.assertEqual(self.authenticate('alice', 'secret', ip='10.0.0.2'), self.alice)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_spoofed_forwarded_addresses_share_the_client_ip(self):
+        factory = RequestFactory()
+        for i in range(5):
+            request = factory.post('/login/', REMOTE_ADDR='10.9.9.9', HTTP_X_FORWARDED_FOR=f'1.1.1.{i}, 10.0.0.7')
+            authenticate(request, username=f'user{i}', password='wrong')
+
+        request = factory.post('/login/', REMOTE_ADDR='10.9.9.9', HTTP_X_FORWARDED_FOR='10.0.0.7')
+        self.assertIsNone(authenticate(request, username='alice', password='secret'))
+
+    def test_login_view_accepts_email(self):
+        response = self.client.post('/login/', {'username': 'alice@example.com', 'password': 'secret'})
+        self.assertRedirects(response, '/home/', fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.alice.id)
+
+    def test_unavailable_throttle_cache_fails_open(self):
+        cache = caches['throttle']
+        broken = mock.patch.multiple(cache, **{name: mock.Mock(side_effect=Exception('no table'))
+                                               for name in ('get_many', 'add', 'delete_many')})
+        with broken, self.assertLogs('calendar_app.throttle', 'WARNING'):
+            self.assertIsNone(self.authenticate('alice', 'wrong'))
+            self.assertEqual(self.authenticate('alice', 'secret'), self.alice)
+
+
+class NotificationSettingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [
+            CustomUser.objects.create_user(
+                username=name, email=f'{name}@example.com', password='secret',
+                birthday=date(2000, 1, 1), gender='Other', reminder_minutes=30,
+            )
+            for name in ('alice', 'bob')
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def event(self, created_by, **fields):
+        return Event.objects.create(
+            title='Event', created_by=created_by, start_time=self.start, end_time=self.start + timedelta(hours=1), **fields
+        )
+
+    def save_settings(self, reminder_minutes):
+        response = self.client.post('/settings/notifications/', {
+            'notification_frequency': 'immediate', 'reminder_minutes': reminder_minutes,
+        })
+        self.assertRedirects(response, '/settings/notifications/', fetch_redirect_response=False)
+
+    def reminders(self, *rows):
+        for row in rows:
+            row.refresh_from_db()
+        return [row.next_reminder_at for row in rows]
+
+    def test_new_default_reschedules_upcoming_reminders(self):
+        own = self.event(self.alice, next_reminder_at=self.start - timedelta(minutes=30))
+        fixed = self.event(self.alice, reminder_minutes=10, next_reminder_at=self.start - timedelta(minutes=10))
+        reminded = self.event(self.alice)
+        accepted = EventInvitation.objects.create(
+            event=self.event(self.bob), user=self.alice, status='accepted', next_reminder_at=self.start - timedelta(minutes=30)
+        )
+
+        self.save_settings('60')
+        self.assertEqual(self.reminders(own, fixed, reminded, accepted), [
+            self.start - timedelta(minutes=60), self.start - timedelta(minutes=10), None, self.start - timedelta(minutes=60),
+        ])
+
+    def test_no_reminders_clears_them(self):
+        own = self.event(self.alice, next_reminder_at=self.start - timedelta(minutes=30))
+        accepted = EventInvitation.objects.create(
+            event=self.event(self.bob), user=self.alice, status='accepted', next_reminder_at=self.start - timedelta(minutes=30)
+        )
+
+        self.save_settings('')
+        self.assertEqual(self.reminders(own, accepted), [None, None])
+
+        # Nothing was sent while reminders were off
+        self.save_settings('10')
+        self.assertEqual(self.reminders(own, accepted), [self.start - timedelta(minutes=10)] * 2)
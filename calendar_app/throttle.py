@@ -0,0 +1,74 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Failed logins are counted per account and per client IP in windows of
+# LOGIN_THROTTLE_WINDOW seconds. Once either count reaches its limit the
+# authentication backend refuses the attempt before looking the user up, so
+# a credential stuffing burst costs neither queries nor password hashes.
+# The throttle fails open, logins keep working while its cache is down.
+
+
+def client_ip(request):
+    # The last TRUSTED_PROXY_COUNT addresses of X-Forwarded-For were appended
+    # by our own proxies, the one before them is the client
+    if settings.TRUSTED_PROXY_COUNT:
+        forwarded = [a.strip() for a in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if a.strip()]
+        if len(forwarded) >= settings.TRUSTED_PROXY_COUNT:
+            return forwarded[-settings.TRUSTED_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _keys(request, usernames):
+    # Keys for the accounts and, with a request, for the client IP
+    keys = {
+        f"login-failures:account:{hashlib.sha256(username.strip().lower().encode()).hexdigest()}":
+            settings.LOGIN_THROTTLE_ACCOUNT_FAILURES
+        for username in usernames
+    }
+    if request is not None:
+        keys[f"login-failures:ip:{client_ip(request)}"] = settings.LOGIN_THROTTLE_IP_FAILURES
+    return keys
+
+
+# The backend passes the login string as typed and, once it found the user,
+# the username. Failures count under both, so the username and email forms
+# of one account share a budget and a repeated string is refused before the
+# user is looked up.
+
+def is_throttled(request, *usernames):
+    keys = _keys(request, usernames)
+    try:
+        failures = caches['throttle'].get_many(keys)
+    except Exception:
+        logger.warning("Login throttle cache unavailable, not throttling", exc_info=True)
+        return False
+    return any(failures.get(key, 0) >= limit for key, limit in keys.items())
+
+
+def record_failure(request, *usernames):
+    cache = caches['throttle']
+    try:
+        for key in _keys(request, usernames):
+            # add() starts the window, later failures don't extend it. incr()
+            # is a read and a write on the database cache, not atomic, so
+            # concurrent failures can overwrite each other and lose a few
+            # counts. That only delays the throttle by a couple of attempts.
+            if not cache.add(key, 1, settings.LOGIN_THROTTLE_WINDOW):
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    # Expired between add() and incr()
+                    cache.set(key, 1, settings.LOGIN_THROTTLE_WINDOW)
+    except Exception:
+        logger.warning("Login throttle cache unavailable, failure not counted", exc_info=True)
+
+
+def reset(*usernames):
+    try:
+        caches['throttle'].delete_many(list(_keys(None, usernames)))
+    except Exception:
+        logger.warning("Login throttle cache unavailable, failures not reset", exc_info=True)
@@ -0,0 +1,72 @@
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from calendar_app.models import CustomUser
+from monitoring.tracing import current_traceparent, trace
+
+logger = logging.getLogger(__name__)
+
+# Profile pictures are pushed to the remote storage outside of the request,
+# the user sees the default picture until the upload is finished.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='profile-upload')
+
+
+def stage_profile_picture(user, uploaded_file):
+    os.makedirs(settings.UPLOAD_STAGING_ROOT, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    staged_path = os.path.join(settings.UPLOAD_STAGING_ROOT, f"{user.id}-{uuid.uuid4().hex}{extension}")
+
+    with open(staged_path, 'wb') as staged_file:
+        for chunk in uploaded_file.chunks():
+            staged_file.write(chunk)
+
+    return staged_path
+
+
+def upload_staged_profile_picture(user_id, staged_path):
+    user = CustomUser.objects.filter(id=user_id).first()
+
+    if user is not None:
+        with open(staged_path, 'rb') as staged_file:
+            user.profile_picture.save(os.path.basename(staged_path), File(staged_file), save=False)
+
+        CustomUser.objects.filter(id=user_id).update(profile_picture=user.profile_picture.name)
+
+    os.remove(staged_path)
+
+
+def _run_upload(user_id, staged_path, traceparent=''):
+    close_old_connections()
+    try:
+        with trace('upload profile picture', parent=traceparent, kind='consumer', user_id=user_id):
+            upload_staged_profile_picture(user_id, staged_path)
+    except Exception:
+        logger.exception("Uploading the profile picture of user %s failed, it stays staged at %s", user_id, staged_path)
+    finally:
+        close_old_connections()
+
+
+def defer_profile_picture_upload(user, uploaded_file):
+    staged_path = stage_profile_picture(user, uploaded_file)
+    traceparent = current_traceparent()
+    transaction.on_commit(lambda: _executor.submit(_run_upload, user.id, staged_path, traceparent))
+    return staged_path
+
+
+def staged_uploads(older_than=0):
+    if not os.path.isdir(settings.UPLOAD_STAGING_ROOT):
+        return []
+
+    cutoff = time.time() - older_than
+    staged = []
+    for name in sorted(os.listdir(settings.UPLOAD_STAGING_ROOT)):
+        path = os.path.join(settings.UPLOAD_STAGING_ROOT, name)
+        user_id = name.split('-', 1)[0]
+        if user_id.isdigit() and os.path.getmtime(path) <= cutoff:
+            staged.append((int(user_id), path))
+    return staged
@@ -4,7 +4,13 @@ from . import views
 urlpatterns = [
     path('', views.welcome_view, name='welcome'),
     path('home/', views.home_view, name='home'),
+    path('month/', views.month_view, name='month_overview'),
+    path('year/', views.year_view, name='year_overview'),
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('settings/notifications/', views.notification_settings_view, name='notification_settings'),
+    path('settings/sharing/', views.share_links_view, name='share_links'),
+    path('settings/sharing/<int:link_id>/revoke/', views.revoke_share_link, name='revoke_share_link'),
+    path('share/<str:token>/', views.shared_calendar_view, name='shared_calendar'),
 ]
\ No newline at end of file
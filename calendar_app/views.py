@@ -1,13 +1,26 @@
-from datetime import timedelta
-from django.db.models import Q
+import calendar
+from datetime import MAXYEAR, MINYEAR, date, datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.utils.timezone import localdate
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.contrib.auth import login, logout
 from django.contrib import messages
-from events.models import Event
-from .forms import RegisterForm, LoginForm
-from .models import CustomUser
+from events import reminders
+from events.archive import reaches_archive
+from events.models import ArchivedEvent, Event
+from . import sharing, throttle
+from .forms import RegisterForm, LoginForm, NotificationSettingsForm
+from .models import ShareLink
+from .uploads import defer_profile_picture_upload
 
 # Create your views here.
 def welcome_view(request):
@@ -27,19 +40,29 @@ def home_view(request):
     prev_week = week_offset - 1
     next_week = week_offset + 1
 
-    events = Event.objects.filter(
+    events = list(Event.objects.filter(
         Q(created_by=request.user, invitations__isnull=True) |
         Q(created_by=request.user, invitations__status='accepted') |
         Q(invitations__user=request.user, invitations__status='accepted')
     ).filter(
         start_time__date__gte=start_of_week,
         start_time__date__lt=end_of_week,
-    ).distinct()
+    ).distinct())
+
+    week_start = timezone.make_aware(datetime.combine(start_of_week, time.min))
+    if reaches_archive(week_start):
+        events += ArchivedEvent.objects.on_calendar_of(request.user).filter(
+            start_time__date__gte=start_of_week,
+            start_time__date__lt=end_of_week,
+        )
 
     days = []
     for i in range(7):
         day_date = start_of_week + timedelta(days=i)
-        day_events = events.filter(start_time__date=day_date)
+        day_events = sorted(
+            (e for e in events if timezone.localdate(e.start_time) == day_date),
+            key=lambda e: e.start_time,
+        )
 
         formatted_events = []
         for e in day_events:
@@ -73,11 +96,229 @@ def home_view(request):
     })
 
 
+def _daily_totals(user, first_day, last_day):
+    range_start = timezone.make_aware(datetime.combine(first_day, time.min))
+    range_end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    duration = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+
+    sources = [Event.objects.on_calendar_of(user)]
+    if reaches_archive(range_start):
+        sources.append(ArchivedEvent.objects.on_calendar_of(user))
+
+    totals = {}
+    for events in sources:
+        rows = (events
+                .filter(start_time__gte=range_start, start_time__lt=range_end)
+                .annotate(day=TruncDate('start_time'))
+                .values('day')
+                .annotate(count=Count('id'), busy=Sum(duration))
+                .order_by('day'))
+
+        for row in rows:
+            day_totals = totals.setdefault(row['day'], {'count': 0, 'busy_minutes': 0})
+            day_totals['count'] += row['count']
+            day_totals['busy_minutes'] += int(row['busy'].total_seconds() // 60) if row['busy'] else 0
+
+    return totals
+
+
+def _week_offset(day):
+    today = localdate()
+    current_week_start = today - timedelta(days=today.weekday())
+    return (day - timedelta(days=day.weekday()) - current_week_start).days // 7
+
+
+def _busy_level(busy_minutes):
+    for level, limit in enumerate([0, 60, 180, 360]):
+        if busy_minutes <= limit:
+            return level
+    return 4
+
+
+def _month_weeks(year, month, totals):
+    weeks = []
+    for week in calendar.Calendar().monthdatescalendar(year, month):
+        days = []
+        for day in week:
+            day_totals = totals.get(day, {'count': 0, 'busy_minutes': 0})
+            days.append({
+                'date': day,
+                'in_month': day.month == month,
+                'count': day_totals['count'],
+                'busy_minutes': day_totals['busy_minutes'],
+                'level': _busy_level(day_totals['busy_minutes']),
+            })
+        weeks.append({'week': _week_offset(week[0]), 'days': days})
+    return weeks
+
+
+def _clamped_param(request, name, default, low, high):
+    # Malformed values fall back to the default, others are kept in range
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        value = default
+    return min(max(value, low), high)
+
+
+# A year of margin, the weeks shown and the prev/next links reach past the month
+YEARS = (MINYEAR + 1, MAXYEAR - 1)
+
+
+@login_required
+def month_view(request):
+    today = localdate()
+    year = _clamped_param(request, 'year', today.year, *YEARS)
+    month = _clamped_param(request, 'month', today.month, 1, 12)
+
+    weeks = calendar.Calendar().monthdatescalendar(year, month)
+    totals = _daily_totals(request.user, weeks[0][0], weeks[-1][-1])
+
+    prev_month = date(year, month, 1) - timedelta(days=1)
+    next_month = date(year, month, 28) + timedelta(days=4)
+
+    return render(request, 'month.html', {
+        'month_start': date(year, month, 1),
+        'weeks': _month_weeks(year, month, totals),
+        'weekdays': calendar.day_abbr,
+        'prev_month': prev_month,
+        'next_month': next_month,
+        'event_count': sum(t['count'] for d, t in totals.items() if d.month == month),
+    })
+
+
+@login_required
+def year_view(request):
+    year = _clamped_param(request, 'year', localdate().year, *YEARS)
+
+    totals = _daily_totals(request.user, date(year, 1, 1), date(year, 12, 31))
+
+    months = [
+        {'month_start': date(year, month, 1), 'weeks': _month_weeks(year, month, totals)}
+        for month in range(1, 13)
+    ]
+
+    return render(request, 'year.html', {
+        'year': year,
+        'months': months,
+        'weekdays': calendar.day_abbr,
+        'prev_year': year - 1,
+        'next_year': year + 1,
+        'event_count': sum(t['count'] for t in totals.values()),
+        'busy_hours': sum(t['busy_minutes'] for t in totals.values()) // 60,
+    })
+
+
+def _shared_week(user, start_of_week):
+    # Public events on the user's calendar, laid out like friend_calendar_view
+    week_start = timezone.make_aware(datetime.combine(start_of_week, time.min))
+    week_end = week_start + timedelta(days=7)
+    sources = [Event, ArchivedEvent] if reaches_archive(week_start) else [Event]
+
+    events = []
+    for model in sources:
+        events += (
+            model.objects.on_calendar_of(user)
+            .filter(visibility='public', start_time__gte=week_start, start_time__lt=week_end)
+            .only('title', 'tag', 'start_time', 'end_time')
+            .order_by('start_time')
+        )
+
+    days = [{'date': start_of_week + timedelta(days=i), 'events': []} for i in range(7)]
+    for e in events:
+        start = timezone.localtime(e.start_time)
+        end = timezone.localtime(e.end_time)
+        start_minutes = start.hour * 60 + start.minute
+        end_minutes = end.hour * 60 + end.minute if end.date() == start.date() else 24 * 60
+        days[(start.date() - start_of_week).days]['events'].append({
+            'title': e.title,
+            'tag': e.tag,
+            'start_offset': start_minutes,
+            'duration_height': end_minutes - start_minutes,
+        })
+    for day in days:
+        day['weekday'] = day['date'].strftime('%A')
+    return days
+
+
+def shared_calendar_view(request, token):
+    # Anonymous and cacheable: nothing here may touch the session or request.user
+    link = sharing.link_for_token(token)
+    if link is None:
+        raise Http404("This share link does not exist or was revoked.")
+
+    today = localdate()
+    # Public, so offsets past the supported years are clamped instead of overflowing
+    week_offset = _clamped_param(
+        request, 'week', 0,
+        -((today - date(YEARS[0], 1, 1)).days // 7), (date(YEARS[1], 12, 31) - today).days // 7,
+    )
+    start_of_week = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+
+    version = sharing.calendar_version(link.user_id)
+    etag = f'"{link.user_id}-{start_of_week:%Y%m%d}-{version}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_cache_control(not_modified, public=True, max_age=settings.SHARE_MAX_AGE)
+        return not_modified
+
+    def build():
+        return {'etag': etag, 'body': render_to_string('shared_calendar.html', {
+            'owner': link.user,
+            'days': _shared_week(link.user, start_of_week),
+            'week_start': start_of_week,
+            'week_end': start_of_week + timedelta(days=6),
+            'prev_week': week_offset - 1,
+            'next_week': week_offset + 1,
+            'hours': range(0, 24),
+        })}
+
+    page_key = f"share-page:{link.user_id}:{start_of_week:%Y%m%d}"
+    page = sharing.cached_page(f"{page_key}:{version}", page_key, build)
+
+    # A page from before the latest change keeps its own ETag
+    response = HttpResponse(page['body'])
+    response['ETag'] = page['etag']
+    patch_cache_control(response, public=True, max_age=settings.SHARE_MAX_AGE)
+    return response
+
+
+@login_required
+def share_links_view(request):
+    if request.method == 'POST':
+        ShareLink.objects.create(user=request.user, label=request.POST.get('label', '').strip()[:100])
+        sharing.calendars_changed([request.user.id])
+        messages.success(request, "Share link created.")
+        return redirect('share_links')
+
+    links = [
+        {'link': link, 'url': request.build_absolute_uri(reverse('shared_calendar', args=[sharing.share_token(link)]))}
+        for link in request.user.share_links.order_by('-created_at')
+    ]
+    return render(request, 'accounts/share_links.html', {'links': links})
+
+
+@login_required
+def revoke_share_link(request, link_id):
+    if request.method == 'POST':
+        get_object_or_404(ShareLink, id=link_id, user=request.user).delete()
+        messages.success(request, "Share link revoked.")
+    return redirect('share_links')
+
+
 def register_view(request):
     if request.method == 'POST':
         form = RegisterForm(request.POST, request.FILES)
         if form.is_valid():
-            user = form.save()
+            user = form.save(commit=False)
+            profile_picture = form.cleaned_data.get('profile_picture')
+            user.profile_picture = None
+            user.save()
+
+            if profile_picture:
+                defer_profile_picture_upload(user, profile_picture)
+
             login(request, user)
             messages.success(request, "Account created successfully!")
             return redirect('home')
@@ -88,23 +329,31 @@ def register_view(request):
     return render(request, 'accounts/register.html', {'form': form})
 
 
+@login_required
+def notification_settings_view(request):
+    if request.method == 'POST':
+        previous_minutes = request.user.reminder_minutes
+        form = NotificationSettingsForm(request.POST, instance=request.user)
+        if form.is_valid():
+            with transaction.atomic():
+                form.save()
+                if form.instance.reminder_minutes != previous_minutes:
+                    reminders.reschedule_user(form.instance, previous_minutes)
+            messages.success(request, "Notification settings saved.")
+            return redirect('notification_settings')
+    else:
+        form = NotificationSettingsForm(instance=request.user)
+    return render(request, 'accounts/notification_settings.html', {'form': form})
+
+
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-
-            try:
-                user_obj = CustomUser.objects.get(email=username)
-                username = user_obj.username
-            except CustomUser.DoesNotExist:
-                pass
-
-            user = authenticate(request, username=username, password=password)
-            if user is not None:
-                login(request, user)
-                return redirect('home')
+            login(request, form.get_user())
+            return redirect('home')
+        if throttle.is_throttled(request, request.POST.get('username', '')):
+            messages.error(request, "Too many failed login attempts, please try again later.")
 
     else:
         form = LoginForm()
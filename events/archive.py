@@ -0,0 +1,100 @@
+import calendar
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from calendar_app import sharing
+from events import counters
+from events.models import ArchivedEvent, ArchivedEventInvitation, Event, EventInvitation, Tombstone
+
+EVENT_FIELDS = [
+    'id', 'title', 'description', 'start_time', 'end_time', 'created_by_id', 'tag', 'visibility',
+    'accepted_count', 'pending_count', 'declined_count',
+]
+INVITATION_FIELDS = ['id', 'event_id', 'user_id', 'group_id', 'status']
+
+
+def archive_cutoff():
+    # Events that ended before this may live in the archive tables
+    now = timezone.now()
+    year, month = divmod(now.year * 12 + now.month - 1 - settings.EVENT_ARCHIVE_AFTER_MONTHS, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+def reaches_archive(range_start):
+    # Views only look into the archive for periods that start before the cutoff
+    return range_start < archive_cutoff()
+
+
+def _delete_rows(model, column, ids):
+    # Plain DELETE without the ORM collector: no rows are loaded and no delete
+    # signals fire, archived events still exist so they leave no sync tombstones
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(ids))})", ids)
+        return cursor.rowcount
+
+
+def _delete_with_dependents(model, ids):
+    # Foreign keys are deferred, so the order only has to be complete by commit
+    for field in model._meta.many_to_many:
+        _delete_rows(field.remote_field.through, field.m2m_column_name(), ids)
+    for relation in model._meta.related_objects:
+        if relation.one_to_many or relation.one_to_one:
+            _delete_rows(relation.related_model, relation.field.column, ids)
+    return _delete_rows(model, model._meta.pk.column, ids)
+
+
+def archive_batch(cutoff, batch_size):
+    # Moves up to batch_size events that ended before cutoff, with their
+    # invitations, in one short transaction. Returns how many were moved
+    with transaction.atomic():
+        events = list(
+            Event.objects.filter(end_time__lt=cutoff)
+            .select_for_update(skip_locked=True)
+            .order_by('id')
+            .values(*EVENT_FIELDS)[:batch_size]
+        )
+        if not events:
+            return 0
+
+        event_ids = [event['id'] for event in events]
+        invitations = list(EventInvitation.objects.filter(event_id__in=event_ids).values(*INVITATION_FIELDS))
+
+        ArchivedEvent.objects.bulk_create([ArchivedEvent(**event) for event in events])
+        ArchivedEventInvitation.objects.bulk_create([ArchivedEventInvitation(**invitation) for invitation in invitations])
+
+        if invitations:
+            _delete_with_dependents(EventInvitation, [invitation['id'] for invitation in invitations])
+        return _delete_with_dependents(Event, event_ids)
+
+
+def purge_declined_batch(declined_before, batch_size):
+    # Deletes up to batch_size invitations declined before declined_before,
+    # keeping RSVP counters and sync tombstones in step. Returns how many went.
+    # Only events that keep a pending or accepted invitation lose their declined
+    # ones: an event whose invitations were all declined stays off the creator's
+    # calendar (on_calendar_of) only as long as those invitations exist.
+    still_invited = EventInvitation.objects.filter(event=OuterRef('event')).exclude(status='declined')
+    with transaction.atomic():
+        invitations = list(
+            EventInvitation.objects.filter(status='declined', updated_at__lt=declined_before)
+            .filter(Exists(still_invited))
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('id')
+            .values_list('id', 'event_id', 'user_id', 'event__created_by_id')[:batch_size]
+        )
+        if not invitations:
+            return 0
+
+        Tombstone.objects.bulk_create([
+            Tombstone(user_id=user_id, kind='invitation', object_id=invitation_id)
+            for invitation_id, _, invitee_id, creator_id in invitations
+            for user_id in {invitee_id, creator_id}
+        ])
+        counters.record_status_changes([(event_id, 'declined', None) for _, event_id, _, _ in invitations])
+        # Plain deletes fire no signals, share pages are invalidated here
+        sharing.calendars_changed([user_id for _, _, invitee_id, creator_id in invitations for user_id in (invitee_id, creator_id)])
+        return _delete_with_dependents(EventInvitation, [invitation[0] for invitation in invitations])
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from events.models import Event, EventInvitation
+
+COUNTER_FIELDS = {
+    'pending': 'pending_count',
+    'accepted': 'accepted_count',
+    'declined': 'declined_count',
+}
+
+
+def record_status_changes(changes):
+    # changes are (event_id, old_status, new_status) tuples, None standing for an
+    # invitation that was created or deleted. All events are adjusted with one
+    # UPDATE of F() + delta, so concurrent writers never overwrite each other
+    deltas = defaultdict(lambda: defaultdict(int))
+    for event_id, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        if old_status:
+            deltas[event_id][COUNTER_FIELDS[old_status]] -= 1
+        if new_status:
+            deltas[event_id][COUNTER_FIELDS[new_status]] += 1
+
+    deltas = {
+        event_id: {field: delta for field, delta in fields.items() if delta}
+        for event_id, fields in deltas.items()
+    }
+    deltas = {event_id: fields for event_id, fields in deltas.items() if fields}
+    if not deltas:
+        return
+
+    updates = {}
+    for field in COUNTER_FIELDS.values():
+        per_event = {event_id: fields[field] for event_id, fields in deltas.items() if field in fields}
+        if not per_event:
+            continue
+
+        if len(deltas) == 1:
+            delta = Value(per_event.popitem()[1])
+        else:
+            delta = Case(
+                *[When(id=event_id, then=Value(delta)) for event_id, delta in per_event.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        # Never below zero, drift from deletes outside the views is left to rebuild_rsvp_counts
+        updates[field] = Greatest(F(field) + delta, Value(0))
+
+    Event.objects.filter(id__in=deltas).update(updated_at=timezone.now(), **updates)
+
+
+def rebuild_counts(events):
+    # Recomputes the counters of the given events from their invitations and
+    # returns how many of them were off
+    counted = {}
+    for status, field in COUNTER_FIELDS.items():
+        subquery = (
+            EventInvitation.objects.filter(event=OuterRef('pk'), status=status)
+            .order_by().values('event').annotate(n=Count('id')).values('n')
+        )
+        counted[field] = Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    drifted = Q()
+    for field in COUNTER_FIELDS.values():
+        drifted |= ~Q(**{field: F(f'real_{field}')})
+
+    events = events.annotate(**{f'real_{field}': expression for field, expression in counted.items()}).filter(drifted)
+    return Event.objects.filter(id__in=list(events.values_list('id', flat=True))).update(updated_at=timezone.now(), **counted)
@@ -0,0 +1,11 @@
+from django.db import transaction
+from events.models import Event
+from jobs.queue import job
+
+
+@job('events.delete_events')
+def delete_events(event_ids, batch_size=100):
+    # Ids that are already gone are skipped, so a retried job just carries on
+    for start in range(0, len(event_ids), batch_size):
+        with transaction.atomic():
+            Event.objects.filter(id__in=event_ids[start:start + batch_size]).delete()
@@ -0,0 +1,44 @@
+from django.db import transaction
+from calendar_app.broker import get_broker
+
+# Small change notices for the pages a user has open, see events.views.event_stream
+
+
+def publish(user_ids, notice):
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        transaction.on_commit(lambda: get_broker().publish(user_ids, notice))
+
+
+def _event_fields(event):
+    return {
+        'event': event.id,
+        'title': event.title,
+        'start_time': event.start_time.isoformat(),
+        'end_time': event.end_time.isoformat(),
+    }
+
+
+def invitation_created(invitation):
+    publish([invitation.user_id], {
+        'type': 'invitation.created',
+        'invitation': invitation.id,
+        **_event_fields(invitation.event),
+    })
+
+
+def invitation_status_changed(invitation):
+    publish([invitation.user_id, invitation.event.created_by_id], {
+        'type': 'invitation.status',
+        'invitation': invitation.id,
+        'user': invitation.user_id,
+        'status': invitation.status,
+        **_event_fields(invitation.event),
+    })
+
+
+def event_moved(event, user_ids):
+    publish([event.created_by_id, *user_ids], {
+        'type': 'event.moved',
+        **_event_fields(event),
+    })
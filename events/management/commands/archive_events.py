@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from events.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = "Moves events that ended more than EVENT_ARCHIVE_AFTER_MONTHS ago into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of events moved per transaction.")
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+
+        archived = 0
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} event(s) that ended before {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from events.archive import purge_declined_batch
+
+
+class Command(BaseCommand):
+    help = "Deletes invitations declined more than DECLINED_INVITATION_RETENTION_DAYS ago (run it daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of invitations deleted per transaction.")
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        declined_before = timezone.now() - timedelta(days=settings.DECLINED_INVITATION_RETENTION_DAYS)
+
+        purged = 0
+        while True:
+            deleted = purge_declined_batch(declined_before, options['batch_size'])
+            if not deleted:
+                break
+            purged += deleted
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} declined invitation(s)."))
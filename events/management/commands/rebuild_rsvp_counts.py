@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from events.counters import rebuild_counts
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Recomputes the accepted/pending/declined counters of events from their invitations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of events updated per statement.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Event.objects.order_by('id').values_list('id', flat=True)
+
+        fixed = 0
+        last_id = 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            fixed += rebuild_counts(Event.objects.filter(id__in=batch))
+            last_id = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed RSVP counts of {fixed} event(s)."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from events.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = "Sends the notification digests of users on the given frequency, run hourly and daily from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('frequency', choices=['hourly', 'daily'])
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Number of users whose digests are sent over one mail connection.")
+
+    def handle(self, *args, **options):
+        frequencies = [options['frequency']]
+        if options['frequency'] == 'hourly':
+            # Notifications left over by users who switched to immediate emails
+            frequencies.append('immediate')
+
+        # Walks the users by id, so users whose rows another run holds are
+        # passed over instead of ending the run
+        users = 0
+        after_user_id = 0
+        while after_user_id is not None:
+            after_user_id, sent = send_digests(frequencies, options['batch_size'], after_user_id)
+            users += sent
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {users} {options['frequency']} digest(s)."))
@@ -0,0 +1,44 @@
+import logging
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from events.reminders import send_due_reminders
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Sends due event reminders until stopped (SIGINT/SIGTERM), several workers can run side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Reminders claimed and sent over one mail connection at a time.")
+        parser.add_argument('--poll-interval', type=float, default=30.0,
+                            help="Seconds to wait before looking again when nothing is due.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once nothing is due instead of waiting.")
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.set())
+
+        sent = 0
+        while not stopping.is_set():
+            close_old_connections()
+            try:
+                claimed, emails = send_due_reminders(options['batch_size'])
+            except Exception:
+                # The claim was rolled back, the same reminders are tried again
+                logger.exception("Sending reminders failed")
+                stopping.wait(options['poll_interval'])
+                continue
+
+            sent += emails
+            if not claimed:
+                if options['once']:
+                    break
+                stopping.wait(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} reminder(s)."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_alter_event_end_time_alter_event_start_time'),
+        ('groups', '0002_remove_group_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_by', 'start_time'], name='events_even_created_b9750e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_time'], name='events_even_start_t_c2d277_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventinvitation',
+            index=models.Index(fields=['user', 'status'], name='events_even_user_id_466917_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventinvitation',
+            index=models.Index(fields=['event', 'status'], name='events_even_event_i_6e3418_idx'),
+        ),
+    ]
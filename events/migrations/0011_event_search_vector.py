@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}.title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}.description, '')), 'B')
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION events_event_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER events_event_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description ON events_event
+        FOR EACH ROW EXECUTE FUNCTION events_event_search_vector_update();
+    """)
+    schema_editor.execute(f"UPDATE events_event SET search_vector = {SEARCH_VECTOR_SQL.format(row='events_event')}")
+    schema_editor.execute("CREATE INDEX events_event_search_gin ON events_event USING gin (search_vector)")
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS events_event_search_gin")
+    schema_editor.execute("DROP TRIGGER IF EXISTS events_event_search_vector_trigger ON events_event")
+    schema_editor.execute("DROP FUNCTION IF EXISTS events_event_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_event_events_even_created_b9750e_idx_and_more'),
+        ('groups', '0002_remove_group_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # The GIN index and the trigger only exist on PostgreSQL, other databases
+        # fall back to icontains in events.views.search_events
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='event',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='events_event_search_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_trigger, drop_search_trigger),
+            ],
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:18
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.operations
+import django.db.models.deletion
+import events.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+OVERLAP_CONSTRAINT = django.contrib.postgres.constraints.ExclusionConstraint(
+    name='events_busyinterval_no_overlap',
+    expressions=[
+        ('user', '='),
+        (events.models.TsTzRange('start_time', 'end_time', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&'),
+    ],
+)
+
+
+def add_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    BusyInterval = apps.get_model('events', 'BusyInterval')
+    schema_editor.add_constraint(BusyInterval, OVERLAP_CONSTRAINT)
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    BusyInterval = apps.get_model('events', 'BusyInterval')
+    schema_editor.remove_constraint(BusyInterval, OVERLAP_CONSTRAINT)
+
+
+def backfill_busy_intervals(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    Event = apps.get_model('events', 'Event')
+    EventInvitation = apps.get_model('events', 'EventInvitation')
+    BusyInterval = apps.get_model('events', 'BusyInterval')
+    db = schema_editor.connection.alias
+
+    # Rows that already overlap are skipped, the constraint only guards new writes
+    rows = (
+        BusyInterval(user_id=user_id, event_id=event_id, start_time=start, end_time=end)
+        for event_id, user_id, start, end in Event.objects.using(db)
+        .values_list('id', 'created_by_id', 'start_time', 'end_time').order_by('start_time').iterator()
+    )
+    BusyInterval.objects.using(db).bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+    rows = (
+        BusyInterval(user_id=user_id, event_id=event_id, invitation_id=invitation_id, start_time=start, end_time=end)
+        for invitation_id, event_id, user_id, start, end in EventInvitation.objects.using(db)
+        .filter(status='accepted')
+        .values_list('id', 'event_id', 'user_id', 'event__start_time', 'event__end_time')
+        .order_by('event__start_time').iterator()
+    )
+    BusyInterval.objects.using(db).bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_event_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.BtreeGistExtension(),
+        migrations.CreateModel(
+            name='BusyInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='busy_intervals', to='events.event')),
+                ('invitation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='busy_interval', to='events.eventinvitation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='busy_intervals', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        # The exclusion constraint needs btree_gist and only exists on PostgreSQL,
+        # other databases rely on the overlap queries in events.scheduling
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(model_name='busyinterval', constraint=OVERLAP_CONSTRAINT),
+            ],
+            database_operations=[
+                migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+            ],
+        ),
+        migrations.RunPython(backfill_busy_intervals, migrations.RunPython.noop),
+    ]
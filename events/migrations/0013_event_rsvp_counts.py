@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_invitations(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventInvitation = apps.get_model('events', 'EventInvitation')
+    db = schema_editor.connection.alias
+
+    updates = {}
+    for status in ['accepted', 'pending', 'declined']:
+        counted = (
+            EventInvitation.objects.using(db).filter(event=OuterRef('pk'), status=status)
+            .order_by().values('event').annotate(n=Count('id')).values('n')
+        )
+        updates[f'{status}_count'] = Coalesce(Subquery(counted, output_field=models.IntegerField()), 0)
+
+    Event.objects.using(db).update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_busyinterval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='accepted_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='declined_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_invitations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_updated_at_tombstone'),
+        ('groups', '0002_remove_group_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('tag', models.CharField(blank=True, choices=[('personal', 'Personal'), ('family', 'Family'), ('social', 'Social'), ('entertainment', 'Entertainment'), ('education', 'Education'), ('holiday', 'Holiday')], max_length=20, null=True)),
+                ('visibility', models.CharField(choices=[('private', 'Only me'), ('public', 'Everyone'), ('invited', 'Only invited users'), ('custom', 'Custom selection')], default='private', max_length=10)),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('declined_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEventInvitation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined')], default='pending', max_length=10)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to='events.archivedevent')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_invitations', to='groups.group')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_invitations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['created_by', 'start_time'], name='events_arch_created_820a12_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['start_time'], name='events_arch_start_t_dd33bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedeventinvitation',
+            index=models.Index(fields=['user', 'status'], name='events_arch_user_id_bc2041_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedeventinvitation',
+            index=models.Index(fields=['event', 'status'], name='events_arch_event_i_20b391_idx'),
+        ),
+    ]
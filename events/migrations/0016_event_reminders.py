@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_archive'),
+        ('groups', '0002_remove_group_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='reminder_minutes',
+            field=models.PositiveIntegerField(blank=True, choices=[(0, 'At start'), (10, '10 minutes before'), (30, '30 minutes before'), (60, '1 hour before'), (1440, '1 day before')], null=True),
+        ),
+        migrations.AddField(
+            model_name='eventinvitation',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('next_reminder_at__isnull', False)), fields=['next_reminder_at'], name='events_event_reminder_due'),
+        ),
+        migrations.AddIndex(
+            model_name='eventinvitation',
+            index=models.Index(condition=models.Q(('next_reminder_at__isnull', False)), fields=['next_reminder_at'], name='events_invitation_reminder_due'),
+        ),
+    ]
@@ -1,12 +1,47 @@
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Exists, Func, OuterRef, Q
 from django.conf import settings
 
+# Text search configuration used by the search_vector trigger and by search queries
+SEARCH_CONFIG = 'simple'
+
 # Create your models here.
 def validate_10_min_interval(dt):
     if dt.minute % 10 != 0:
         raise ValidationError("Time must be in 10-minute intervals.")
 
+class EventQuerySet(models.QuerySet):
+    def on_calendar_of(self, *users):
+        # Own events that nobody declined away (no invitations or at least one acceptance)
+        # plus events the users accepted, without joins so there is nothing to distinct()
+        invitations = EventInvitation.objects.filter(event=OuterRef('pk'))
+        accepted = invitations.filter(status='accepted')
+
+        return self.filter(
+            Q(created_by__in=users) & (~Exists(invitations) | Exists(accepted)) |
+            Exists(accepted.filter(user__in=users))
+        )
+
+    def visible_to(self, user):
+        # Same rules as Event.can_user_view, as one filter for a whole queryset
+        invitations = EventInvitation.objects.filter(event=OuterRef('pk'), user=user)
+        friends = Event.visible_to_friends.through.objects.filter(event=OuterRef('pk'), customuser=user)
+        groups = Event.visible_to_groups.through.objects.filter(event=OuterRef('pk'), group__members=user)
+
+        return self.filter(
+            Q(created_by=user) |
+            Q(visibility='public') |
+            Q(visibility='invited') & Exists(invitations) |
+            Q(visibility='custom') & (Exists(friends) | Exists(groups)) |
+            ~Q(visibility__in=['public', 'invited', 'custom']) & Exists(invitations.filter(status='accepted'))
+        )
+
+
 class Event(models.Model):
     TAG_CHOICES = [
         ('personal', 'Personal'),
@@ -24,6 +59,14 @@ class Event(models.Model):
         ('custom', 'Custom selection'),
     ]
 
+    REMINDER_CHOICES = [
+        (0, 'At start'),
+        (10, '10 minutes before'),
+        (30, '30 minutes before'),
+        (60, '1 hour before'),
+        (1440, '1 day before'),
+    ]
+
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     start_time = models.DateTimeField(validators=[validate_10_min_interval])
@@ -33,6 +76,30 @@ class Event(models.Model):
     visibility = models.CharField(max_length=10, choices=VISIBILITY_CHOICES, default='private')
     visible_to_friends = models.ManyToManyField(settings.AUTH_USER_MODEL, blank=True, related_name='events_visibility')
     visible_to_groups = models.ManyToManyField('groups.Group', blank=True, related_name='events_visibility')
+    # Filled by a database trigger on PostgreSQL, stays empty elsewhere
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Invitation counters kept in step by events.counters, rebuilt by the
+    # rebuild_rsvp_counts command
+    accepted_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    declined_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on every change, QuerySet.update() calls have to set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
+    # Lead time for everyone attending, None leaves it to each user's preference
+    reminder_minutes = models.PositiveIntegerField(choices=REMINDER_CHOICES, null=True, blank=True)
+    # When the creator is reminded, cleared once sent (see events.reminders)
+    next_reminder_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'start_time']),
+            models.Index(fields=['start_time']),
+            models.Index(fields=['updated_at', 'id']),
+            GinIndex(fields=['search_vector'], name='events_event_search_gin'),
+            models.Index(fields=['next_reminder_at'], name='events_event_reminder_due', condition=Q(next_reminder_at__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.created_by.username})"
@@ -65,6 +132,165 @@ class EventInvitation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='friend_invitations')
     group = models.ForeignKey('groups.Group', on_delete=models.CASCADE, null=True, blank=True, related_name='group_invitations')
     status = models.CharField(max_length=10, choices=INVITE_STATUS, default='pending')
+    updated_at = models.DateTimeField(auto_now=True)
+    # When the invitee is reminded, only set while the invitation is accepted
+    next_reminder_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['event', 'status']),
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['next_reminder_at'], name='events_invitation_reminder_due', condition=Q(next_reminder_at__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} → {self.event.title} ({self.status})"
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class BusyInterval(models.Model):
+    # One row per user and event occupying their calendar: the creator's row
+    # has no invitation, invitees get one while their invitation is accepted.
+    # On PostgreSQL the exclusion constraint rejects overlapping rows of a user.
+    OVERLAP_CONSTRAINT = 'events_busyinterval_no_overlap'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='busy_intervals')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='busy_intervals')
+    invitation = models.OneToOneField(EventInvitation, on_delete=models.CASCADE, null=True, blank=True, related_name='busy_interval')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            ExclusionConstraint(
+                name='events_busyinterval_no_overlap',
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    (TsTzRange('start_time', 'end_time', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.start_time} - {self.end_time}"
+
+
+class Tombstone(models.Model):
+    # Left behind for every user who could have an event or invitation in their
+    # synced copy when it gets deleted, so /api/sync/ can report the deletion
+    KIND_CHOICES = [
+        ('event', 'Event'),
+        ('invitation', 'Invitation'),
+    ]
+
+    # No database constraint: deleting a user deletes their events, whose
+    # pre_delete handler may still write tombstones for that user
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False, related_name='tombstones')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} (deleted {self.deleted_at})"
+
+
+class PendingNotification(models.Model):
+    # Waits for the next digest of a user who does not want immediate emails.
+    # One row per user and event, so an event rescheduled several times is
+    # listed once, with the time it has when the digest is sent.
+    KIND_CHOICES = [
+        ('invited', 'Invited'),
+        ('rescheduled', 'Rescheduled'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pending_notifications')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='pending_notifications')
+    group = models.ForeignKey('groups.Group', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    kind = models.CharField(max_length=15, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'event')
+
+    def __str__(self):
+        return f"{self.user.username}: {self.event.title} ({self.kind})"
+
+
+class ArchivedEventQuerySet(models.QuerySet):
+    def on_calendar_of(self, *users):
+        invitations = ArchivedEventInvitation.objects.filter(event=OuterRef('pk'))
+        accepted = invitations.filter(status='accepted')
+
+        return self.filter(
+            Q(created_by__in=users) & (~Exists(invitations) | Exists(accepted)) |
+            Exists(accepted.filter(user__in=users))
+        )
+
+    def visible_to(self, user):
+        # Custom visibility lists are not archived, such events stay hidden from others
+        invitations = ArchivedEventInvitation.objects.filter(event=OuterRef('pk'), user=user)
+
+        return self.filter(
+            Q(created_by=user) |
+            Q(visibility='public') |
+            Q(visibility='invited') & Exists(invitations) |
+            ~Q(visibility__in=['public', 'invited', 'custom']) & Exists(invitations.filter(status='accepted'))
+        )
+
+
+class ArchivedEvent(models.Model):
+    # Events that ended more than EVENT_ARCHIVE_AFTER_MONTHS ago, moved here by
+    # the archive_events command with their original ids
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_events')
+    tag = models.CharField(max_length=20, choices=Event.TAG_CHOICES, blank=True, null=True)
+    visibility = models.CharField(max_length=10, choices=Event.VISIBILITY_CHOICES, default='private')
+    accepted_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    declined_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'start_time']),
+            models.Index(fields=['start_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.created_by.username}, archived)"
+
+    def can_user_view(self, user):
+        return ArchivedEvent.objects.visible_to(user).filter(id=self.id).exists()
+
+
+class ArchivedEventInvitation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='invitations')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_invitations')
+    group = models.ForeignKey('groups.Group', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_invitations')
+    status = models.CharField(max_length=10, choices=EventInvitation.INVITE_STATUS, default='pending')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['event', 'status']),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} → {self.event.title} ({self.status})"
\ No newline at end of file
+        return f"{self.user.username} → {self.event.title} ({self.status}, archived)"
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from events.models import EventInvitation, PendingNotification
+
+# Invitation and reschedule emails. Users who want them immediately get one
+# email per event, everybody else gets a PendingNotification that
+# send_digests merges into one email per user and hour or day.
+
+
+def _time(event):
+    return (f"{event.start_time.strftime('%d-%m-%Y %H:%M')} - "
+            f"{event.end_time.strftime('%d-%m-%Y %H:%M')}")
+
+
+def _invitation_message(event, user, group):
+    if group:
+        invited = f"{event.created_by.username} has invited your group '{group.name}' to the event '{event.title}'."
+    else:
+        invited = f"{event.created_by.username} has invited you to the event '{event.title}'."
+
+    return EmailMessage(
+        subject=f"You’ve been invited to '{event.title}'!",
+        body=(f"Hi {user.username},\n\n"
+              f"{invited}\n"
+              f"Time: {_time(event)}\n\n"
+              f"Please check your calendar and respond to the invitation.\n\n"
+              f"– MyCalendar Team"),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _reschedule_message(event, user):
+    return EmailMessage(
+        subject=f"Event '{event.title}' has been rescheduled",
+        body=(f"Hi {user.username},\n\n"
+              f"The event '{event.title}' has new start/end times.\n"
+              f"New time: {_time(event)}\n\n"
+              f"Please check your calendar and re-accept the invitation.\n\n"
+              f"– MyCalendar Team"),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _digest_entry(notification):
+    event = notification.event
+    if notification.kind == 'invited':
+        if notification.group:
+            return f"- {event.created_by.username} invited your group '{notification.group.name}' to '{event.title}', {_time(event)}"
+        return f"- {event.created_by.username} invited you to '{event.title}', {_time(event)}"
+    return f"- '{event.title}' has been rescheduled to {_time(event)}, please re-accept the invitation"
+
+
+def _digest_message(user, notifications):
+    return EmailMessage(
+        subject=f"{len(notifications)} update(s) on MyCalendar",
+        body=(f"Hi {user.username},\n\n"
+              f"Here is what happened since your last digest:\n\n"
+              + "\n".join(_digest_entry(n) for n in notifications) +
+              f"\n\nPlease check your calendar and respond to the invitations.\n\n"
+              f"– MyCalendar Team"),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _notify(kind, event, users, group, build, fail_silently):
+    immediate = [u for u in users if u.notification_frequency == 'immediate']
+    # An event that is already waiting in a user's digest keeps its entry,
+    # the digest shows the current time anyway
+    PendingNotification.objects.bulk_create(
+        [PendingNotification(user=u, event=event, group=group, kind=kind)
+         for u in users if u.notification_frequency != 'immediate'],
+        ignore_conflicts=True,
+    )
+    if immediate:
+        get_connection(fail_silently=fail_silently).send_messages([build(u) for u in immediate])
+
+
+def notify_invited(event, users, group=None):
+    _notify('invited', event, users, group, lambda u: _invitation_message(event, u, group), fail_silently=False)
+
+
+def notify_rescheduled(event, users):
+    _notify('rescheduled', event, users, None, lambda u: _reschedule_message(event, u), fail_silently=True)
+
+
+def send_digests(frequencies, batch_size, after_user_id=0):
+    # Sends the digests of up to batch_size users with ids above after_user_id.
+    # Returns the last user id looked at (None once there are no more users)
+    # and how many digests were sent. Rows locked by another run are skipped,
+    # a failed send rolls the batch back.
+    with transaction.atomic():
+        user_ids = list(
+            PendingNotification.objects.filter(user__notification_frequency__in=frequencies, user_id__gt=after_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()[:batch_size]
+        )
+        if not user_ids:
+            return None, 0
+
+        # Invitations answered or deleted since are dropped with the rest
+        still_pending = EventInvitation.objects.filter(user=OuterRef('user'), event=OuterRef('event'), status='pending')
+        pending = list(
+            PendingNotification.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(user_id__in=user_ids)
+            .annotate(still_pending=Exists(still_pending))
+            .select_related('user', 'event__created_by', 'group')
+            .order_by('user_id', 'event__start_time')
+        )
+
+        by_user = defaultdict(list)
+        for notification in pending:
+            if notification.still_pending:
+                by_user[notification.user].append(notification)
+
+        if by_user:
+            with get_connection() as connection:
+                connection.send_messages([_digest_message(user, n) for user, n in by_user.items()])
+
+        PendingNotification.objects.filter(id__in=[n.id for n in pending]).delete()
+
+    return user_ids[-1], len(by_user)
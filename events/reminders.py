@@ -0,0 +1,120 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from events.models import Event, EventInvitation
+
+# Reminders are rows with next_reminder_at set: the creator's on Event, every
+# accepted invitee's on EventInvitation. Both columns have partial indexes,
+# so finding due reminders never scans the events themselves.
+
+
+def lead_minutes(event, user):
+    return event.reminder_minutes if event.reminder_minutes is not None else user.reminder_minutes
+
+
+def reminder_time(event, user):
+    # Late schedules (an acceptance 5 minutes before the start) are sent right away
+    minutes = lead_minutes(event, user)
+    now = timezone.now()
+    if minutes is None or event.start_time <= now:
+        return None
+    return max(event.start_time - timedelta(minutes=minutes), now)
+
+
+def schedule_creator(event):
+    # Caller saves the event
+    event.next_reminder_at = reminder_time(event, event.created_by)
+
+
+def schedule_invitations(invitations):
+    # Sets next_reminder_at on the given invitations, the caller saves them
+    for invitation in invitations:
+        if invitation.status == 'accepted':
+            invitation.next_reminder_at = reminder_time(invitation.event, invitation.user)
+        else:
+            invitation.next_reminder_at = None
+
+
+def reschedule_invitations(event):
+    # After the lead time of the event changed, for the invitees that were
+    # not reminded yet
+    invitations = list(
+        event.invitations.filter(status='accepted', next_reminder_at__isnull=False).select_related('user')
+    )
+    for invitation in invitations:
+        invitation.event = event
+    schedule_invitations(invitations)
+    EventInvitation.objects.bulk_update(invitations, ['next_reminder_at'])
+
+
+def reschedule_user(user, previous_minutes):
+    # After the user's default lead time changed, for their upcoming events
+    # and accepted invitations that use it. With a previous default the rows
+    # already reminded are left alone, without one nothing was sent yet.
+    now = timezone.now()
+    events = Event.objects.filter(created_by=user, reminder_minutes__isnull=True, start_time__gt=now)
+    invitations = EventInvitation.objects.filter(
+        user=user, status='accepted', event__reminder_minutes__isnull=True, event__start_time__gt=now
+    ).select_related('event')
+    if previous_minutes is not None:
+        events = events.filter(next_reminder_at__isnull=False)
+        invitations = invitations.filter(next_reminder_at__isnull=False)
+
+    events = list(events)
+    for event in events:
+        event.created_by = user
+        schedule_creator(event)
+    Event.objects.bulk_update(events, ['next_reminder_at'])
+
+    invitations = list(invitations)
+    for invitation in invitations:
+        invitation.user = user
+    schedule_invitations(invitations)
+    EventInvitation.objects.bulk_update(invitations, ['next_reminder_at'])
+
+
+def _message(event, user):
+    return EmailMessage(
+        subject=f"Reminder: '{event.title}' starts at {timezone.localtime(event.start_time).strftime('%H:%M')}",
+        body=(f"Hi {user.username},\n\n"
+              f"This is a reminder for the event '{event.title}'.\n"
+              f"Time: {event.start_time.strftime('%d-%m-%Y %H:%M')} - "
+              f"{event.end_time.strftime('%d-%m-%Y %H:%M')}\n\n"
+              f"– MyCalendar Team"),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def send_due_reminders(batch_size):
+    # Claims up to batch_size due creator and invitee reminders with SKIP
+    # LOCKED, so several workers never send the same reminder, and sends them
+    # over one mail connection. A failed send rolls the claim back.
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            Event.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(next_reminder_at__lte=now)
+            .select_related('created_by')
+            .order_by('next_reminder_at')[:batch_size]
+        )
+        invitations = list(
+            EventInvitation.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(next_reminder_at__lte=now)
+            .select_related('event', 'user')
+            .order_by('next_reminder_at')[:batch_size]
+        )
+
+        # Reminders that were due while no worker ran are dropped once the event started
+        emails = [_message(e, e.created_by) for e in events if e.start_time > now]
+        emails += [_message(i.event, i.user) for i in invitations if i.event.start_time > now]
+        if emails:
+            with get_connection() as connection:
+                connection.send_messages(emails)
+
+        Event.objects.filter(id__in=[e.id for e in events]).update(next_reminder_at=None)
+        EventInvitation.objects.filter(id__in=[i.id for i in invitations]).update(next_reminder_at=None)
+
+    return len(events) + len(invitations), len(emails)
@@ -0,0 +1,178 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from events.models import BusyInterval, Event, EventInvitation
+
+
+class ScheduleConflict(Exception):
+    pass
+
+
+def busy_intervals(user, start, end, exclude_event=None):
+    # Everything the overlap checks count as busy: events the user created and
+    # invitations the user accepted, limited to the [start, end) window
+    accepted = EventInvitation.objects.filter(event=OuterRef('pk'), user=user, status='accepted')
+    events = Event.objects.filter(Q(created_by=user) | Exists(accepted)).filter(start_time__lt=end, end_time__gt=start)
+
+    if exclude_event is not None:
+        events = events.exclude(id=exclude_event.id)
+
+    return list(events.values_list('start_time', 'end_time'))
+
+
+def overlaps(intervals, start, end):
+    return any(busy_start < end and busy_end > start for busy_start, busy_end in intervals)
+
+
+# Free slot suggestions search this far around the requested time, on the
+# 10-minute grid events are allowed to start on
+SLOT_SEARCH_WINDOW = timedelta(days=1)
+SLOT_STEP = timedelta(minutes=10)
+
+
+def _round_up(moment):
+    remainder = (moment - moment.replace(minute=0, second=0, microsecond=0)) % SLOT_STEP
+    return moment + (SLOT_STEP - remainder) % SLOT_STEP
+
+
+def _round_down(moment):
+    return moment - (moment - moment.replace(minute=0, second=0, microsecond=0)) % SLOT_STEP
+
+
+def nearest_free_slots(user, start, end, exclude_event=None):
+    # The closest free (start, end) of the same length before and after the
+    # requested time, or None, with one query for the surrounding window.
+    # A blocked candidate jumps past everything it overlaps.
+    length = end - start
+    window_start = max(start - SLOT_SEARCH_WINDOW, _round_up(timezone.now()))
+    window_end = end + SLOT_SEARCH_WINDOW
+    busy = busy_intervals(user, window_start, window_end, exclude_event=exclude_event)
+
+    def blocking(slot_start):
+        return [b for b in busy if b[0] < slot_start + length and b[1] > slot_start]
+
+    before = _round_down(start) - SLOT_STEP
+    while before >= window_start and blocking(before):
+        before = _round_down(min(b[0] for b in blocking(before)) - length)
+
+    after = _round_up(max(start, window_start))
+    while after + length <= window_end and blocking(after):
+        after = _round_up(max(b[1] for b in blocking(after)))
+
+    return (
+        (before, before + length) if before >= window_start else None,
+        (after, after + length) if after + length <= window_end else None,
+    )
+
+
+def settle_acceptances(user, invitations):
+    # Splits invitations into those that fit the user's schedule and those that
+    # conflict, also with each other (earlier events win), using one query
+    if not invitations:
+        return [], []
+
+    invitations = sorted(invitations, key=lambda i: (i.event.start_time, i.event.end_time))
+    busy = busy_intervals(
+        user,
+        invitations[0].event.start_time,
+        max(i.event.end_time for i in invitations),
+    )
+
+    accepted, conflicting = [], []
+    for invitation in invitations:
+        event = invitation.event
+        if overlaps(busy, event.start_time, event.end_time):
+            conflicting.append(invitation)
+        else:
+            accepted.append(invitation)
+            busy.append((event.start_time, event.end_time))
+
+    return accepted, conflicting
+
+
+# On PostgreSQL busy time is reserved in BusyInterval and the exclusion constraint
+# rejects double bookings atomically. Other databases have no such constraint,
+# so the reserve functions fall back to checking busy_intervals before writing.
+
+def _enforced_by_database():
+    return connection.vendor == 'postgresql'
+
+
+@contextmanager
+def _reserving():
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as error:
+        diag = getattr(error.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) == BusyInterval.OVERLAP_CONSTRAINT:
+            raise ScheduleConflict from error
+        raise
+
+
+def _check_free(user, event):
+    if overlaps(busy_intervals(user, event.start_time, event.end_time, exclude_event=event), event.start_time, event.end_time):
+        raise ScheduleConflict
+
+
+def reserve_event(event):
+    # Called right after the event is created, inside the same transaction
+    if not _enforced_by_database():
+        _check_free(event.created_by_id, event)
+        return
+
+    with _reserving():
+        BusyInterval.objects.create(
+            user_id=event.created_by_id, event=event, start_time=event.start_time, end_time=event.end_time
+        )
+
+
+def move_event(event):
+    # The creator's interval follows the event, invitees lose theirs when the
+    # time changes because their invitations go back to pending
+    if not _enforced_by_database():
+        _check_free(event.created_by_id, event)
+        return
+
+    with _reserving():
+        moved = BusyInterval.objects.filter(event=event, invitation__isnull=True).update(
+            start_time=event.start_time, end_time=event.end_time
+        )
+        if not moved:
+            BusyInterval.objects.create(
+                user_id=event.created_by_id, event=event, start_time=event.start_time, end_time=event.end_time
+            )
+        BusyInterval.objects.filter(event=event, invitation__isnull=False).exclude(
+            start_time=event.start_time, end_time=event.end_time
+        ).delete()
+
+
+def reserve_invitations(invitations):
+    # Invitations of one user with their event loaded, called before their
+    # status is written as accepted
+    if not invitations:
+        return
+
+    if not _enforced_by_database():
+        if settle_acceptances(invitations[0].user_id, invitations)[1]:
+            raise ScheduleConflict
+        return
+
+    with _reserving():
+        BusyInterval.objects.bulk_create([
+            BusyInterval(
+                user_id=invitation.user_id,
+                event_id=invitation.event_id,
+                invitation=invitation,
+                start_time=invitation.event.start_time,
+                end_time=invitation.event.end_time,
+            )
+            for invitation in invitations
+        ])
+
+
+def release_invitations(invitations):
+    if _enforced_by_database():
+        BusyInterval.objects.filter(invitation__in=invitations).delete()
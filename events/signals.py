@@ -0,0 +1,81 @@
+import threading
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from calendar_app.sharing import calendars_changed
+from events.models import Event, EventInvitation, Tombstone
+
+# Events being deleted by the current thread, their cascaded invitations were
+# already tombstoned in bulk by leave_event_tombstones
+_deleting = threading.local()
+
+
+def _deleting_events():
+    if not hasattr(_deleting, 'event_ids'):
+        _deleting.event_ids = set()
+    return _deleting.event_ids
+
+
+@receiver(pre_delete, sender=Event)
+def leave_event_tombstones(sender, instance, **kwargs):
+    # pre_delete, the invitations that tell us who synced the event are still there
+    invitations = list(EventInvitation.objects.filter(event=instance).values_list('id', 'user_id'))
+    user_ids = {instance.created_by_id} | {user_id for _, user_id in invitations}
+
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=user_id, kind='event', object_id=instance.id) for user_id in user_ids
+    ] + [
+        Tombstone(user_id=user_id, kind='invitation', object_id=invitation_id)
+        for invitation_id, invitee_id in invitations
+        for user_id in {invitee_id, instance.created_by_id}
+    ])
+    _deleting_events().add(instance.id)
+
+
+@receiver(post_delete, sender=Event)
+def forget_deleted_event(sender, instance, **kwargs):
+    _deleting_events().discard(instance.id)
+
+
+@receiver(post_delete, sender=EventInvitation)
+def leave_invitation_tombstones(sender, instance, **kwargs):
+    if instance.event_id in _deleting_events():
+        return
+
+    user_ids = {instance.user_id}
+    user_ids.update(Event.objects.filter(id=instance.event_id).values_list('created_by_id', flat=True))
+
+    # Without the invitation the event also leaves the invitee's synced calendar
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=user_id, kind='invitation', object_id=instance.id) for user_id in user_ids
+    ] + [
+        Tombstone(user_id=instance.user_id, kind='event', object_id=instance.event_id)
+    ])
+
+
+# Share pages (calendar_app.sharing) of everybody whose calendar shows the
+# event. Acceptances and declines change the creator's calendar too, since
+# an own event with only declined invitations is not on it.
+
+def _attendees(event):
+    return EventInvitation.objects.filter(event=event, status='accepted').values_list('user_id', flat=True)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    calendars_changed([instance.created_by_id, *([] if created else _attendees(instance))])
+
+
+@receiver(pre_delete, sender=Event)
+def event_deleting(sender, instance, **kwargs):
+    calendars_changed([instance.created_by_id, *_attendees(instance)])
+
+
+@receiver(post_save, sender=EventInvitation)
+def invitation_saved(sender, instance, **kwargs):
+    calendars_changed([instance.user_id, instance.event.created_by_id])
+
+
+@receiver(post_delete, sender=EventInvitation)
+def invitation_deleted(sender, instance, **kwargs):
+    if instance.event_id not in _deleting_events():
+        calendars_changed([instance.user_id, *Event.objects.filter(id=instance.event_id).values_list('created_by_id', flat=True)])
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from events.models import Event, EventInvitation, Tombstone
+
+TOKEN_SALT = 'events.sync'
+
+EVENT_FIELDS = [
+    'id', 'title', 'description', 'tag', 'visibility', 'start_time', 'end_time', 'created_by',
+    'accepted_count', 'pending_count', 'declined_count', 'updated_at',
+]
+INVITATION_FIELDS = ['id', 'event', 'user', 'group', 'status', 'updated_at']
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def _streams(user):
+    # (token key, queryset, timestamp field, fields) for everything a synced
+    # calendar of the user holds
+    invited = EventInvitation.objects.filter(event=OuterRef('pk'), user=user)
+
+    return [
+        ('events', Event.objects.filter(Q(created_by=user) | Exists(invited)), 'updated_at', EVENT_FIELDS),
+        ('invitations', EventInvitation.objects.filter(Q(user=user) | Q(event__created_by=user)), 'updated_at', INVITATION_FIELDS),
+        ('deleted', Tombstone.objects.filter(user=user), 'deleted_at', ['id', 'kind', 'object_id', 'deleted_at']),
+    ]
+
+
+def encode_token(cursors):
+    return signing.dumps(
+        {key: [moment.isoformat(), last_id] for key, (moment, last_id) in cursors.items()},
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+
+def decode_token(token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+        cursors = {key: (datetime.fromisoformat(moment), last_id) for key, (moment, last_id) in data.items()}
+    except (signing.BadSignature, ValueError, TypeError, AttributeError) as e:
+        raise InvalidToken from e
+
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if cursors.get('deleted', (timezone.now(), 0))[0] < timezone.now() - retention:
+        raise ExpiredToken
+
+    return cursors
+
+
+def changes_since(user, token=None, limit=None):
+    # One bounded page per stream ordered by (timestamp, id). The token holds
+    # the last (timestamp, id) returned by every stream, has_more tells the
+    # client to call again straight away
+    limit = min(limit or settings.SYNC_PAGE_SIZE, settings.SYNC_PAGE_SIZE)
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+    if token:
+        cursors = decode_token(token)
+    else:
+        # A first sync downloads everything, deletions only matter from here on
+        cursors = {'deleted': (cutoff, 0)}
+
+    page = {}
+    has_more = False
+    for key, queryset, moment_field, fields in _streams(user):
+        queryset = queryset.filter(**{f'{moment_field}__lte': cutoff})
+        if key in cursors:
+            moment, last_id = cursors[key]
+            queryset = queryset.filter(
+                Q(**{f'{moment_field}__gt': moment}) | Q(**{moment_field: moment, 'id__gt': last_id})
+            )
+
+        rows = list(queryset.order_by(moment_field, 'id').values(*fields)[:limit + 1])
+        if len(rows) > limit:
+            has_more = True
+            rows = rows[:limit]
+        if rows:
+            cursors[key] = (rows[-1][moment_field], rows[-1]['id'])
+        if key == 'deleted' and len(rows) < limit:
+            # Caught up: move past the cutoff so the token does not age out
+            # while nothing gets deleted
+            cursors[key] = (cutoff, 0)
+
+        if key == 'deleted':
+            rows = [{'kind': row['kind'], 'id': row['object_id'], 'deleted_at': row['deleted_at']} for row in rows]
+        page[key] = rows
+
+    page['next'] = encode_token(cursors)
+    page['has_more'] = has_more
+    return page
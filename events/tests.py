@@ -1,3 +1,250 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core import signing
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from calendar_app.models import CustomUser
+from events import scheduling, sync
+from events.models import BusyInterval, Event, EventInvitation
+from events.scheduling import ScheduleConflict
 
-# Create your tests here.
+# Far enough ahead that nothing here is in the past or due for a reminder
+DAY = datetime(2100, 1, 4, tzinfo=dt_timezone.utc)
+
+
+def make_user(username):
+    return CustomUser.objects.create_user(
+        username=username, email=f'{username}@example.com', password='secret',
+        birthday=datetime(2000, 1, 1).date(), gender='Other',
+    )
+
+
+def make_event(created_by, start_hour, end_hour, title='Event', **fields):
+    return Event.objects.create(
+        title=title, created_by=created_by,
+        start_time=DAY + timedelta(hours=start_hour), end_time=DAY + timedelta(hours=end_hour), **fields
+    )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkInvitationResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = make_user('alice'), make_user('bob'), make_user('carol')
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def invite(self, user, start_hour, end_hour, title='Event'):
+        return EventInvitation.objects.create(event=make_event(self.bob, start_hour, end_hour, title), user=user)
+
+    def respond(self, response, invitations):
+        return self.client.post('/events/respond/', {
+            'response': response, 'invitations': [str(i.id) for i in invitations],
+        })
+
+    def statuses(self, *invitations):
+        return [EventInvitation.objects.get(id=i.id).status for i in invitations]
+
+    def test_overlapping_invitations_are_settled_in_one_request(self):
+        own = make_event(self.alice, 12.5, 13.5, 'Own')
+        scheduling.reserve_event(own)
+        early = self.invite(self.alice, 9, 10, 'Early')
+        first = self.invite(self.alice, 10, 11, 'First')
+        overlapping = self.invite(self.alice, 10.5, 11.5, 'Overlapping')
+        clashing = self.invite(self.alice, 12, 13, 'Clashing')
+
+        response = self.respond('accept', [clashing, overlapping, first, early])
+
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        # The earlier of two overlapping invitations wins, the user's own event always does
+        self.assertEqual(self.statuses(early, first, overlapping, clashing), ['accepted', 'accepted', 'pending', 'pending'])
+        self.assertEqual(Event.objects.get(id=first.event_id).accepted_count, 1)
+
+    def test_settle_acceptances_is_one_query(self):
+        make_event(self.alice, 12.5, 13.5, 'Own')
+        invitations = [self.invite(self.alice, 9, 10), self.invite(self.alice, 12, 13), self.invite(self.alice, 9.5, 10.5)]
+        invitations = list(EventInvitation.objects.filter(id__in=[i.id for i in invitations]).select_related('event'))
+
+        with self.assertNumQueries(1):
+            accepted, conflicting = scheduling.settle_acceptances(self.alice, invitations)
+        self.assertEqual([i.event.start_time.hour for i in accepted], [9])
+        self.assertEqual(sorted(i.event.start_time.hour for i in conflicting), [9, 12])
+
+    def test_query_count_does_not_grow_with_the_invitations(self):
+        def queries(count, first_hour):
+            invitations = [self.invite(self.alice, first_hour + 2 * i, first_hour + 2 * i + 1) for i in range(count)]
+            with CaptureQueriesContext(connection) as captured:
+                self.respond('accept', invitations)
+            self.assertEqual(self.statuses(*invitations), ['accepted'] * count)
+            return len(captured.captured_queries)
+
+        self.assertEqual(queries(2, 0), queries(6, 24))
+
+    def test_other_users_invitations_are_left_alone(self):
+        mine = self.invite(self.alice, 9, 10)
+        theirs = self.invite(self.carol, 11, 12)
+
+        self.respond('accept', [mine, theirs])
+        self.respond('decline', [theirs])
+
+        self.assertEqual(self.statuses(mine, theirs), ['accepted', 'pending'])
+
+    def test_non_numeric_ids_are_rejected(self):
+        mine = self.invite(self.alice, 9, 10)
+
+        response = self.client.post('/events/respond/', {'response': 'accept', 'invitations': [str(mine.id), 'x']})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(mine), ['pending'])
+
+
+# add_event renders its form again on a conflict, without a collectstatic manifest
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class ReservationTests(TestCase):
+    # On PostgreSQL the exclusion constraint is what rejects these, elsewhere
+    # the reserve functions check busy_intervals first
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = make_user('alice'), make_user('bob')
+        cls.own = make_event(cls.alice, 10, 11, 'Own')
+        scheduling.reserve_event(cls.own)
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def test_overlapping_event_is_a_schedule_conflict(self):
+        with transaction.atomic():
+            event = make_event(self.alice, 10.5, 11.5)
+            with self.assertRaises(ScheduleConflict):
+                scheduling.reserve_event(event)
+
+    def test_adjacent_event_is_not_a_conflict(self):
+        scheduling.reserve_event(make_event(self.alice, 11, 12))
+        scheduling.reserve_event(make_event(self.bob, 10, 11))
+
+    def test_overlapping_acceptance_is_a_schedule_conflict(self):
+        invitation = EventInvitation.objects.create(event=make_event(self.bob, 9.5, 10.5), user=self.alice)
+        with self.assertRaises(ScheduleConflict):
+            scheduling.reserve_invitations([invitation])
+
+    def test_add_event_reports_the_conflict(self):
+        response = self.client.post('/events/add/', {
+            'title': 'Clash', 'visibility': 'private', 'start_time': '2100-01-04T10:30', 'end_time': '2100-01-04T11:30',
+        }, HTTP_REFERER='/events/')
+
+        self.assertFalse(Event.objects.filter(title='Clash').exists())
+        self.assertIn("You already have an event scheduled during this time!", [str(m) for m in get_messages(response.wsgi_request)][0])
+
+    def test_accepting_reports_the_conflict(self):
+        invitation = EventInvitation.objects.create(event=make_event(self.bob, 9.5, 10.5, 'Clash'), user=self.alice)
+
+        response = self.client.post(f'/events/respond/{invitation.id}/', {'response': 'accept'})
+
+        self.assertRedirects(response, '/events/', fetch_redirect_response=False)
+        invitation.refresh_from_db()
+        self.assertEqual(invitation.status, 'pending')
+        self.assertFalse(BusyInterval.objects.filter(invitation=invitation).exists())
+        self.assertIn("You already have an event scheduled during this time.", [str(m) for m in get_messages(response.wsgi_request)][0])
+
+    @skipUnless(connection.vendor == 'postgresql', "the exclusion constraint only exists on PostgreSQL")
+    def test_constraint_rejects_overlapping_rows(self):
+        event = make_event(self.alice, 10.5, 11.5)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BusyInterval.objects.create(user=self.alice, event=event, start_time=event.start_time, end_time=event.end_time)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    SYNC_SETTLE_SECONDS=0,
+)
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = make_user('alice'), make_user('bob')
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        return self.client.get('/api/sync/', params)
+
+    def test_token_round_trips(self):
+        moment = timezone.now()
+        cursors = {'events': (moment, 3), 'deleted': (moment, 0)}
+
+        self.assertEqual(sync.decode_token(sync.encode_token(cursors)), cursors)
+
+    def test_delta_only_holds_what_changed(self):
+        event = make_event(self.alice, 9, 10)
+        first = self.sync().json()
+        self.assertEqual([e['id'] for e in first['events']], [event.id])
+
+        self.assertEqual(self.sync(first['next']).json()['events'], [])
+
+        event.title = 'Renamed'
+        event.save()
+        delta = self.sync(first['next']).json()
+        self.assertEqual([e['title'] for e in delta['events']], ['Renamed'])
+
+    def test_pages_until_caught_up(self):
+        events = [make_event(self.alice, hour, hour + 1) for hour in range(3)]
+
+        seen, token, has_more = [], None, True
+        while has_more:
+            page = self.sync(token, limit=2).json()
+            seen += [e['id'] for e in page['events']]
+            token, has_more = page['next'], page['has_more']
+        self.assertEqual(seen, [e.id for e in events])
+
+    def test_tampered_token_is_rejected(self):
+        token = self.sync().json()['next']
+
+        for bad in (token[:-2] + 'xx', 'garbage', signing.dumps({'deleted': 'x'}, salt=sync.TOKEN_SALT)):
+            response = self.sync(bad)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'invalid sync token'})
+
+    def test_expired_token_requires_a_full_sync(self):
+        old = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+
+        response = self.sync(sync.encode_token({'deleted': (old, 0)}))
+
+        self.assertEqual(response.status_code, 410)
+
+    def test_deleted_events_leave_tombstones(self):
+        event = make_event(self.bob, 9, 10)
+        invitation = EventInvitation.objects.create(event=event, user=self.alice)
+        token = self.sync().json()['next']
+
+        event_id = event.id
+        event.delete()
+
+        deleted = self.sync(token).json()['deleted']
+        self.assertCountEqual([(d['kind'], d['id']) for d in deleted], [('event', event_id), ('invitation', invitation.id)])
+
+    def test_uninvited_events_leave_tombstones(self):
+        event = make_event(self.bob, 9, 10)
+        invitation = EventInvitation.objects.create(event=event, user=self.alice)
+        token = self.sync().json()['next']
+        self.client.force_login(self.bob)
+        creator_token = self.sync().json()['next']
+
+        invitation_id = invitation.id
+        invitation.delete()
+
+        # The event leaves the invitee's calendar, the creator keeps it
+        deleted = self.sync(creator_token).json()['deleted']
+        self.assertEqual([(d['kind'], d['id']) for d in deleted], [('invitation', invitation_id)])
+        self.client.force_login(self.alice)
+        deleted = self.sync(token).json()['deleted']
+        self.assertCountEqual([(d['kind'], d['id']) for d in deleted], [('invitation', invitation_id), ('event', event.id)])
@@ -4,8 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.event_list, name='event_list'),
     path('add/', views.add_event, name='add_event'),
+    path('search/', views.search_events, name='search_events'),
     path('<int:event_id>/', views.event_details, name='event_details'),
     path('<int:event_id>/edit/', views.edit_event, name='edit_event'),
     path('<int:event_id>/delete/', views.delete_event, name='delete_event'),
     path('respond/<int:invitation_id>/', views.invitation_response, name='invitation_response'),
+    path('respond/', views.invitation_response_bulk, name='invitation_response_bulk'),
+    path('stream/', views.event_stream, name='event_stream'),
 ]
\ No newline at end of file
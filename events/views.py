@@ -1,14 +1,25 @@
+import asyncio
+import json
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.paginator import Paginator
 from django.utils import timezone
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.dateparse import parse_datetime
 from django.contrib import messages
-from events.models import Event, EventInvitation
-from friends.models import Friendship
+from calendar_app import sharing
+from calendar_app.broker import get_broker
+from events import counters, live, notifications, reminders, sync
+from events import scheduling
+from events.scheduling import ScheduleConflict, settle_acceptances
+from events.models import ArchivedEvent, Event, EventInvitation, SEARCH_CONFIG
+from friends.models import friends_of
 from groups.models import Group
 
 # Create your views here.
@@ -17,6 +28,37 @@ User = get_user_model()
 def is_valid_minute_increment(dt, interval=10):
     return dt.minute % interval == 0
 
+
+def allowed_choices(queryset, ids):
+    # Submitted ids are checked against what the user may pick with one id__in
+    # query, None when any of them is not allowed
+    ids = {i for i in ids if i}
+    if not all(i.isdigit() for i in ids):
+        return None
+    chosen = list(queryset.filter(id__in=ids)) if ids else []
+    return chosen if len(chosen) == len(ids) else None
+
+
+def parse_reminder_minutes(value):
+    # '' or an unknown value leaves the lead time to each attendee
+    return {str(minutes): minutes for minutes, _ in Event.REMINDER_CHOICES}.get(value)
+
+
+def _slot_label(slot):
+    start, end = (timezone.localtime(t) for t in slot)
+    if start.date() == end.date():
+        return f"{start:%a %d-%m %H:%M}-{end:%H:%M}"
+    return f"{start:%a %d-%m %H:%M} - {end:%a %d-%m %H:%M}"
+
+
+def conflict_error(request, error, start, end, exclude_event=None):
+    # Adds the nearest free times of the same length to the error, so the user
+    # does not have to guess and resubmit
+    slots = [slot for slot in scheduling.nearest_free_slots(request.user, start, end, exclude_event) if slot]
+    if slots:
+        error += " Nearest free times: " + " or ".join(_slot_label(slot) for slot in slots) + "."
+    messages.error(request, error)
+
 @login_required
 def event_list(request):
     selected_tag = request.GET.get('tag', 'all')
@@ -30,9 +72,9 @@ def event_list(request):
         created_events = created_events.filter(tag=selected_tag)
 
     pending_invitations = (EventInvitation.objects.filter(user=request.user, status='pending')
-                           .exclude(event__created_by=request.user))
+                           .exclude(event__created_by=request.user).select_related('event'))
     accepted_invitations = (EventInvitation.objects.filter(user=request.user, status='accepted')
-                            .exclude(event__created_by=request.user))
+                            .exclude(event__created_by=request.user).select_related('event__created_by'))
     sent_invitations = (EventInvitation.objects.filter(event__created_by=request.user, status='pending')
                         .select_related('event', 'user'))
 
@@ -46,10 +88,33 @@ def event_list(request):
 
 
 @login_required
-def add_event(request):
-    friends = Friendship.objects.filter(Q(from_user=request.user) | Q(to_user=request.user), is_accepted=True)
-    friend_users = [f.to_user if f.from_user == request.user else f.from_user for f in friends]
+def search_events(request):
+    q = request.GET.get('q', '').strip()
+    events = Event.objects.none()
+
+    if q:
+        events = Event.objects.visible_to(request.user).select_related('created_by')
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+            events = (events.filter(search_vector=query)
+                      .annotate(rank=SearchRank(F('search_vector'), query))
+                      .order_by('-rank', '-start_time'))
+        else:
+            events = events.filter(Q(title__icontains=q) | Q(description__icontains=q)).order_by('-start_time')
+
+    page = Paginator(events, 20).get_page(request.GET.get('page'))
+
+    return render(request, 'events/search.html', {
+        'q': q,
+        'page': page,
+    })
+
 
+@login_required
+def add_event(request):
+    # Friends and groups are picked through friend_autocomplete/group_autocomplete
+    friends = friends_of(request.user)
     groups = Group.objects.filter(created_by=request.user)
 
     if request.method == 'POST':
@@ -57,6 +122,7 @@ def add_event(request):
         description = request.POST.get('description', '')
         tag = request.POST.get('tag', '')
         visibility = request.POST.get('visibility')
+        reminder_minutes = parse_reminder_minutes(request.POST.get('reminder_minutes'))
         start_time = parse_datetime(request.POST['start_time'])
         end_time = parse_datetime(request.POST['end_time'])
         invited_friend_id = request.POST.get('friend')
@@ -64,119 +130,85 @@ def add_event(request):
 
         if not all([title, start_time, end_time]):
             messages.error(request, "Please fill all required fields.")
-            return render(request, 'events/add_event.html', {
-                'friends': friend_users,
-                'groups': groups
-            })
+            return render(request, 'events/add_event.html')
 
         if start_time >= end_time:
             messages.error(request, "Start time must be before end time.")
-            return render(request, 'events/add_event.html', {
-                'friends': friend_users,
-                'groups': groups
-            })
+            return render(request, 'events/add_event.html')
 
         if not is_valid_minute_increment(start_time) or not is_valid_minute_increment(end_time):
             messages.error(request, "Minutes must be in 10-minute intervals.")
-            return render(request, 'events/add_event.html', {
-                'friends': friend_users,
-                'groups': groups
-            })
+            return render(request, 'events/add_event.html')
 
         if invited_friend_id and invited_group_id:
             messages.error(request, "You can invite either a friend OR a group, not both.")
-            return render(request, 'events/add_event.html', {
-                'friends': friend_users,
-                'groups': groups
-            })
-
-        overlap_exists = (
-            Event.objects.filter(
-                created_by=request.user,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            ).exists()
-            or EventInvitation.objects.filter(
-                    user=request.user,
-                    status='accepted',
-                    event__start_time__lt=end_time,
-                    event__end_time__gt=start_time
-            ).exists()
-        )
+            return render(request, 'events/add_event.html')
 
-        if overlap_exists:
-            messages.error(request, "You already have an event scheduled during this time!")
-            return render(request, 'events/add_event.html', {
-                'friends': friend_users,
-                'groups': groups
-            })
-
-        event = Event.objects.create(
-            title=title,
-            description=description,
-            tag=tag,
-            visibility=visibility,
-            start_time=start_time,
-            end_time=end_time,
-            created_by=request.user
-        )
+        invited_friends = allowed_choices(friends, [invited_friend_id])
+        invited_groups = allowed_choices(groups, [invited_group_id])
+        visible_friends = allowed_choices(friends, request.POST.getlist('visible_to_friends'))
+        visible_groups = allowed_choices(groups, request.POST.getlist('visible_to_groups'))
 
-        if visibility == 'custom':
-            selected_friends = request.POST.getlist('visible_to_friends')
-            selected_groups = request.POST.getlist('visible_to_groups')
-
-            if selected_friends:
-                event.visible_to_friends.set(User.objects.filter(id__in=selected_friends))
-            if selected_groups:
-                event.visible_to_groups.set(Group.objects.filter(id__in=selected_groups))
-
-        if invited_friend_id:
-            friend = User.objects.get(id=invited_friend_id)
-            EventInvitation.objects.create(event=event, user=friend)
-
-            send_mail(
-                subject=f"You’ve been invited to '{event.title}'!",
-                message=(f"Hi {friend.username},\n\n"
-                         f"{request.user.username} has invited you to the event '{event.title}'.\n"
-                         f"Time: {event.start_time.strftime('%d-%m-%Y %H:%M')} - "
-                         f"{event.end_time.strftime('%d-%m-%Y %H:%M')}\n\n"
-                         f"Please check your calendar and respond to the invitation.\n\n"
-                         f"– MyCalendar Team"),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[friend.email],
-                fail_silently=False,
-            )
+        if None in (invited_friends, invited_groups, visible_friends, visible_groups):
+            messages.error(request, "You can only pick your own friends and groups.")
+            return render(request, 'events/add_event.html')
+
+        start_time = timezone.make_aware(start_time) if timezone.is_naive(start_time) else start_time
+        end_time = timezone.make_aware(end_time) if timezone.is_naive(end_time) else end_time
 
-        elif invited_group_id:
-            group = Group.objects.get(id=invited_group_id)
-            for member in group.members.exclude(id=request.user.id):
-                EventInvitation.objects.create(event=event, user=member, group=group)
-
-                send_mail(
-                    subject=f"You’ve been invited to '{event.title}'!",
-                    message=(f"Hi {member.username},\n\n"
-                        f"{request.user.username} has invited your group '{group.name}' to the event '{event.title}'.\n"
-                        f"Time: {event.start_time.strftime('%d-%m-%Y %H:%M')} - "
-                        f"{event.end_time.strftime('%d-%m-%Y %H:%M')}\n\n"
-                        f"Please check your calendar and respond to the invitation.\n\n"
-                        f"– MyCalendar Team"),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[member.email],
-                    fail_silently=False,
+        try:
+            with transaction.atomic():
+                event = Event(
+                    title=title,
+                    description=description,
+                    tag=tag,
+                    visibility=visibility,
+                    reminder_minutes=reminder_minutes,
+                    start_time=start_time,
+                    end_time=end_time,
+                    created_by=request.user
                 )
+                reminders.schedule_creator(event)
+                event.save()
+                scheduling.reserve_event(event)
+        except ScheduleConflict:
+            conflict_error(request, "You already have an event scheduled during this time!", start_time, end_time)
+            return render(request, 'events/add_event.html')
+
+        if visibility == 'custom':
+            if visible_friends:
+                event.visible_to_friends.set(visible_friends)
+            if visible_groups:
+                event.visible_to_groups.set(visible_groups)
+
+        if invited_friends:
+            friend = invited_friends[0]
+            invitation = EventInvitation.objects.create(event=event, user=friend)
+            counters.record_status_changes([(event.id, None, 'pending')])
+            live.invitation_created(invitation)
+
+            notifications.notify_invited(event, [friend])
+
+        elif invited_groups:
+            group = invited_groups[0]
+            members = list(group.members.exclude(id=request.user.id))
+            counters.record_status_changes([(event.id, None, 'pending')] * len(members))
+
+            for member in members:
+                invitation = EventInvitation.objects.create(event=event, user=member, group=group)
+                live.invitation_created(invitation)
+
+            notifications.notify_invited(event, members, group=group)
 
         messages.success(request, "Event created successfully!")
         return redirect('event_list')
 
-    return render(request, 'events/add_event.html', {
-        'friends': friend_users,
-        'groups': groups
-    })
+    return render(request, 'events/add_event.html')
 
 
 @login_required
 def delete_event(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
+    event = get_object_or_404(Event, id=event_id, created_by=request.user)
     event.delete()
 
     messages.success(request, "Event deleted successfully.")
@@ -185,13 +217,17 @@ def delete_event(request, event_id):
 
 @login_required
 def event_details(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    invitations = event.invitations
-    accepted_invitations = event.invitations.filter(status='accepted')
+    event = Event.objects.select_related('created_by').filter(id=event_id).first()
+    archived = event is None
+    if archived:
+        # Links from archived weeks keep working, the archive keeps event ids
+        event = get_object_or_404(ArchivedEvent.objects.select_related('created_by'), id=event_id)
+
+    accepted_invitations = event.invitations.filter(status='accepted').select_related('user') if event.accepted_count else []
 
     return render(request, 'events/event_details.html', {
         'event': event,
-        'invitations': invitations,
+        'archived': archived,
         'accepted_invitations': accepted_invitations,
     })
 
@@ -203,8 +239,7 @@ def edit_event(request, event_id):
     if event.created_by != request.user:
         return redirect('event_list')
 
-    friends = Friendship.objects.filter(Q(from_user=request.user) | Q(to_user=request.user), is_accepted=True)
-    friend_users = [f.to_user if f.from_user == request.user else f.from_user for f in friends]
+    friends = friends_of(request.user)
     groups = Group.objects.filter(created_by=request.user)
 
     if request.method == 'POST':
@@ -212,6 +247,7 @@ def edit_event(request, event_id):
         description = request.POST.get('description', '')
         tag = request.POST.get('tag', '')
         visibility = request.POST.get('visibility')
+        reminder_minutes = parse_reminder_minutes(request.POST.get('reminder_minutes'))
         start_time = parse_datetime(request.POST.get('start_time'))
         end_time = parse_datetime(request.POST.get('end_time'))
 
@@ -223,6 +259,13 @@ def edit_event(request, event_id):
             messages.error(request, "Minutes must be in 10-minute intervals.")
             return redirect('edit_event', event_id=event.id)
 
+        visible_friends = allowed_choices(friends, request.POST.getlist('visible_to_friends'))
+        visible_groups = allowed_choices(groups, request.POST.getlist('visible_to_groups'))
+
+        if visible_friends is None or visible_groups is None:
+            messages.error(request, "You can only pick your own friends and groups.")
+            return redirect('edit_event', event_id=event.id)
+
         start_time = timezone.make_aware(start_time) if timezone.is_naive(start_time) else start_time
         end_time = timezone.make_aware(end_time) if timezone.is_naive(end_time) else end_time
 
@@ -234,37 +277,34 @@ def edit_event(request, event_id):
                 old_end.replace(microsecond=0) != end_time.replace(microsecond=0)
         )
 
-        overlap_created = Event.objects.filter(
-            created_by=request.user,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exclude(id=event.id).exists()
-
-        overlap_invited = EventInvitation.objects.filter(
-            user=request.user,
-            status='accepted',
-            event__start_time__lt=end_time,
-            event__end_time__gt=start_time
-        ).exclude(event=event).exists()
-
-        if overlap_created or overlap_invited:
-            messages.error(request, "You already have an event scheduled during this time.")
-            return redirect('edit_event', event_id=event.id)
+        lead_changed = event.reminder_minutes != reminder_minutes
 
         event.title = title
         event.description = description
         event.tag = tag
         event.visibility = visibility
+        event.reminder_minutes = reminder_minutes
         event.start_time = start_time
         event.end_time = end_time
-        event.save()
 
-        if event.visibility == 'custom':
-            selected_friends = request.POST.getlist('visible_to_friends')
-            selected_groups = request.POST.getlist('visible_to_groups')
+        # A sent reminder is only sent again when the event moved
+        if time_changed or (lead_changed and event.next_reminder_at is not None):
+            reminders.schedule_creator(event)
+
+        try:
+            with transaction.atomic():
+                event.save()
+                if time_changed:
+                    scheduling.move_event(event)
+                elif lead_changed:
+                    reminders.reschedule_invitations(event)
+        except ScheduleConflict:
+            conflict_error(request, "You already have an event scheduled during this time.", start_time, end_time, exclude_event=event)
+            return redirect('edit_event', event_id=event.id)
 
-            event.visible_to_friends.set(User.objects.filter(id__in=selected_friends))
-            event.visible_to_groups.set(Group.objects.filter(id__in=selected_groups))
+        if event.visibility == 'custom':
+            event.visible_to_friends.set(visible_friends)
+            event.visible_to_groups.set(visible_groups)
         else:
             event.visible_to_friends.clear()
             event.visible_to_groups.clear()
@@ -272,33 +312,30 @@ def edit_event(request, event_id):
         has_invites = EventInvitation.objects.filter(event=event).exclude(user=request.user)
 
         if time_changed and has_invites.exists():
-            has_invites.update(status='pending')
+            reset_accepted = has_invites.filter(status='accepted').update(status='pending', next_reminder_at=None, updated_at=timezone.now())
+            reset_declined = has_invites.filter(status='declined').update(status='pending', updated_at=timezone.now())
+            counters.record_status_changes(
+                [(event.id, 'accepted', 'pending')] * reset_accepted +
+                [(event.id, 'declined', 'pending')] * reset_declined
+            )
+            invitee_ids = list(has_invites.values_list('user_id', flat=True))
+            # update() sends no signals, the version bumped by event.save()
+            # above was taken before these invitations went back to pending
+            sharing.calendars_changed([event.created_by_id, *invitee_ids])
+            live.event_moved(event, invitee_ids)
             messages.info(request, "Time changed — all invited users must accept again.")
 
-            for invite in has_invites:
-                send_mail(
-                    subject=f"Event '{event.title}' has been rescheduled",
-                    message=(
-                        f"Hi {invite.user.username},\n\n"
-                        f"The event '{event.title}' has new start/end times.\n"
-                        f"New time: {event.start_time.strftime('%d-%m-%Y %H:%M')} - "
-                        f"{event.end_time.strftime('%d-%m-%Y %H:%M')}\n\n"
-                        f"Please check your calendar and re-accept the invitation.\n\n"
-                        f"– MyCalendar Team"
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[invite.user.email],
-                    fail_silently=True,
-                )
+            notifications.notify_rescheduled(event, [invite.user for invite in has_invites.select_related('user')])
         else:
             messages.success(request, "Event updated successfully.")
 
         return redirect('event_details', event_id=event.id)
 
+    # Only the current selection is rendered, more is searched in the pickers
     return render(request, 'events/edit_event.html', {
         'event': event,
-        'friends': friend_users,
-        'groups': groups,
+        'selected_friends': event.visible_to_friends.all(),
+        'selected_groups': event.visible_to_groups.all(),
     })
 
 
@@ -310,32 +347,142 @@ def invitation_response(request, invitation_id):
         response = request.POST.get('response')
         event = invitation.event
 
-        if response == 'accept':
-            overlap_exists = (
-                    EventInvitation.objects.filter(
-                    user=request.user,
-                    status='accepted',
-                    event__start_time__lt=event.end_time,
-                    event__end_time__gt=event.start_time
-                ).exists()
-                or Event.objects.filter(
-                    created_by=request.user,
-                    start_time__lt=event.end_time,
-                    end_time__gt=event.start_time
-                ).exists()
-            )
+        if response == 'accept' and invitation.status != 'accepted':
+            try:
+                with transaction.atomic():
+                    scheduling.reserve_invitations([invitation])
+                    counters.record_status_changes([(event.id, invitation.status, 'accepted')])
+                    invitation.status = 'accepted'
+                    reminders.schedule_invitations([invitation])
+                    invitation.save()
+            except ScheduleConflict:
+                conflict_error(request, "You already have an event scheduled during this time.", event.start_time, event.end_time)
+                return redirect('event_list')
+
+            messages.success(request, f"You accepted the invitation to {event.title}.")
+
+        elif response == 'decline':
+            with transaction.atomic():
+                scheduling.release_invitations([invitation])
+                counters.record_status_changes([(event.id, invitation.status, 'declined')])
+                invitation.status = 'declined'
+                reminders.schedule_invitations([invitation])
+                invitation.save()
+            messages.info(request, f"You declined the invitation to {event.title}.")
+
+        else:
+            return redirect('event_list')
+
+        live.invitation_status_changed(invitation)
 
-            if overlap_exists:
-                messages.error(request, f"You already have an event scheduled during this time.")
+    return redirect('event_list')
+
+
+@login_required
+def invitation_response_bulk(request):
+    if request.method == 'POST':
+        response = request.POST.get('response')
+        invitation_ids = request.POST.getlist('invitations')
+        # The form only posts checkbox ids, anything else is a forged request.
+        # Up to 18 digits always fits the database's integers
+        if not all(i.isascii() and i.isdigit() and len(i) <= 18 for i in invitation_ids):
+            return HttpResponse("Invalid invitation ids.", status=400, content_type='text/plain')
+        invitations = list(
+            EventInvitation.objects.filter(id__in=invitation_ids, user=request.user)
+            .exclude(status='accepted' if response == 'accept' else 'declined')
+            .select_related('event', 'user')
+        )
+
+        if response == 'accept':
+            changed, conflicting = settle_acceptances(request.user, invitations)
+            status_changes = [(i.event_id, i.status, 'accepted') for i in changed]
+            for invitation in changed:
+                invitation.status = 'accepted'
+                invitation.updated_at = timezone.now()
+            reminders.schedule_invitations(changed)
+
+            try:
+                with transaction.atomic():
+                    scheduling.reserve_invitations(changed)
+                    EventInvitation.objects.bulk_update(changed, ['status', 'updated_at', 'next_reminder_at'])
+                    counters.record_status_changes(status_changes)
+                    sharing.calendars_changed([request.user.id, *(i.event.created_by_id for i in changed)])
+            except ScheduleConflict:
+                # Another request booked the time after settle_acceptances looked
+                messages.error(request, "You already have an event scheduled during this time.")
                 return redirect('event_list')
 
-            invitation.status = 'accepted'
-            messages.success(request, f"You accepted the invitation to {invitation.event.title}.")
+            if changed:
+                messages.success(request, f"You accepted {len(changed)} invitation(s).")
+            if conflicting:
+                titles = ", ".join(i.event.title for i in conflicting)
+                messages.error(request, f"You already have an event scheduled during: {titles}.")
 
         elif response == 'decline':
-            invitation.status = 'declined'
-            messages.info(request, f"You declined the invitation to {invitation.event.title}.")
+            changed = invitations
+            status_changes = [(i.event_id, i.status, 'declined') for i in changed]
+            for invitation in changed:
+                invitation.status = 'declined'
+                invitation.updated_at = timezone.now()
+            reminders.schedule_invitations(changed)
+
+            with transaction.atomic():
+                scheduling.release_invitations(changed)
+                EventInvitation.objects.bulk_update(changed, ['status', 'updated_at', 'next_reminder_at'])
+                counters.record_status_changes(status_changes)
+                sharing.calendars_changed([request.user.id, *(i.event.created_by_id for i in changed)])
+
+            if changed:
+                messages.info(request, f"You declined {len(changed)} invitation(s).")
+        else:
+            changed = []
+
+        for invitation in changed:
+            live.invitation_status_changed(invitation)
+
+    return redirect('event_list')
 
-        invitation.save()
 
-    return redirect('event_list')
\ No newline at end of file
+@login_required
+def sync_changes(request):
+    try:
+        limit = int(request.GET.get('limit', 0)) or None
+        changes = sync.changes_since(request.user, request.GET.get('since'), limit)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    except sync.InvalidToken:
+        return JsonResponse({'error': 'invalid sync token'}, status=400)
+    except sync.ExpiredToken:
+        # Tombstones this old are gone, the client has to start over without a token
+        return JsonResponse({'error': 'sync token expired, full sync required'}, status=410)
+
+    return JsonResponse(changes)
+
+
+async def _stream_notices(user_id):
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f"retry: {settings.LIVE_UPDATES_RETRY_MS}\n\n"
+        while True:
+            try:
+                notice = await asyncio.wait_for(subscription.get(), timeout=settings.LIVE_UPDATES_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {notice['type']}\ndata: {json.dumps(notice)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@login_required
+async def event_stream(request):
+    # A WSGI worker would be held for the whole connection, 204 tells EventSource not to reconnect
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    response = StreamingHttpResponse(_stream_notices(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
\ No newline at end of file
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from events import counters
+from events.models import Event, EventInvitation
+from friends.models import Friendship
+from groups.models import Group
+from jobs.queue import job
+
+User = get_user_model()
+
+
+@job('friends.clean_up_unfriended')
+def clean_up_unfriended(user_id, friend_id):
+    # Everything remove_friend used to do after deleting the friendship
+    if Friendship.objects.filter(
+        Q(from_user_id=user_id, to_user_id=friend_id) |
+        Q(from_user_id=friend_id, to_user_id=user_id)
+    ).exists():
+        # They became friends again before the job ran
+        return
+
+    friend = User.objects.filter(id=friend_id).first()
+    if friend is None:
+        return
+
+    with transaction.atomic():
+        for g in Group.objects.filter(created_by_id=user_id, members=friend):
+            g.members.remove(friend)
+
+        for event in Event.objects.filter(created_by_id=user_id, visible_to_friends=friend):
+            event.visible_to_friends.remove(friend)
+
+        for event in Event.objects.filter(created_by_id=user_id, visible_to_groups__members=friend).distinct():
+            event.visible_to_groups.remove(*event.visible_to_groups.filter(members=friend))
+
+    invitations = EventInvitation.objects.filter(event__created_by_id=user_id, user=friend).select_related('event')
+
+    for invitation in invitations:
+        with transaction.atomic():
+            event = invitation.event
+            other_invitations = EventInvitation.objects.filter(event=event).exclude(user=friend)
+            if not other_invitations.exists():
+                event.delete()
+            else:
+                invitation.delete()
+                counters.record_status_changes([(event.id, invitation.status, None)])
+
+    with transaction.atomic():
+        received = EventInvitation.objects.filter(event__created_by=friend, user_id=user_id)
+        removed = [(event_id, status, None) for event_id, status in received.values_list('event_id', 'status')]
+        received.delete()
+        counters.record_status_changes(removed)
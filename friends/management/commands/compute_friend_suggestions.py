@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from friends.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the stored friend suggestions from mutual friend counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=settings.FRIEND_SUGGESTIONS_PER_USER,
+                            help="Suggestions kept per user.")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Number of users whose mutual friends are counted at once.")
+
+    def handle(self, *args, **options):
+        users, stored = compute_suggestions(options['limit'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} suggestion(s) for {users} user(s)."))
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q
 
 # Create your models here.
 class Friendship(models.Model):
@@ -12,4 +14,29 @@ class Friendship(models.Model):
 
     def __str__(self):
         status = "Accepted" if self.is_accepted else "Pending"
-        return f"{self.from_user.username} → {self.to_user.username} ({status})"
\ No newline at end of file
+        return f"{self.from_user.username} → {self.to_user.username} ({status})"
+
+
+def friends_of(user):
+    # The other side of every accepted friendship of user, as a lazy queryset
+    # without joins, so it can be paged, searched or used in id__in checks
+    accepted = Friendship.objects.filter(is_accepted=True)
+    return get_user_model().objects.filter(Exists(accepted.filter(
+        Q(from_user=user, to_user=OuterRef('pk')) | Q(from_user=OuterRef('pk'), to_user=user)
+    )))
+
+# Precomputed "people you may know", rebuilt by compute_friend_suggestions
+class FriendSuggestion(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='friend_suggestions')
+    suggested_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    mutual_friends = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'suggested_user')
+        indexes = [
+            models.Index(fields=['user', '-mutual_friends']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} → {self.suggested_user.username} ({self.mutual_friends} mutual)"
@@ -0,0 +1,69 @@
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils import timezone
+from friends.models import Friendship, FriendSuggestion
+
+
+def _symmetric(rows, cols, size, dtype):
+    # Friendships are stored once per pair, the graph needs both directions
+    data = np.ones(2 * len(rows), dtype=dtype)
+    matrix = sparse.coo_matrix((data, (np.r_[rows, cols], np.r_[cols, rows])), shape=(size, size)).tocsr()
+    matrix.data[:] = 1
+    return matrix
+
+
+def _top_suggestions(mutual, limit):
+    # Per row the users with the most mutual friends, ties by lower user id
+    for row in range(mutual.shape[0]):
+        start, end = mutual.indptr[row], mutual.indptr[row + 1]
+        counts = mutual.data[start:end]
+        columns = mutual.indices[start:end]
+        for position in np.lexsort((columns, -counts))[:limit]:
+            yield row, columns[position], counts[position]
+
+
+def compute_suggestions(limit, chunk_size):
+    # Mutual friend counts are the square of the friendship matrix,
+    # computed for chunk_size users at a time to bound memory
+    started = timezone.now()
+    pairs = np.array(
+        Friendship.objects.values_list('from_user_id', 'to_user_id', 'is_accepted'),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+    user_ids = np.unique(pairs[:, :2])
+    size = len(user_ids)
+    from_index = np.searchsorted(user_ids, pairs[:, 0])
+    to_index = np.searchsorted(user_ids, pairs[:, 1])
+    accepted = pairs[:, 2].astype(bool)
+
+    friends = _symmetric(from_index[accepted], to_index[accepted], size, np.int32)
+    # Friends, open requests in either direction and the user themselves are
+    # never suggested
+    known = _symmetric(from_index, to_index, size, np.int32) + sparse.identity(size, dtype=np.int32, format='csr')
+
+    stored = 0
+    for start in range(0, size, chunk_size):
+        end = min(start + chunk_size, size)
+        mutual = friends[start:end] @ friends
+        mutual = (mutual - mutual.multiply(known[start:end])).tocsr()
+        mutual.eliminate_zeros()
+
+        suggestions = [
+            FriendSuggestion(
+                user_id=int(user_ids[start + row]),
+                suggested_user_id=int(user_ids[column]),
+                mutual_friends=int(count),
+                computed_at=started,
+            )
+            for row, column, count in _top_suggestions(mutual, limit)
+        ]
+        with transaction.atomic():
+            FriendSuggestion.objects.filter(user_id__in=user_ids[start:end].tolist()).delete()
+            FriendSuggestion.objects.bulk_create(suggestions)
+        stored += len(suggestions)
+
+    # Users that dropped out of the graph
+    FriendSuggestion.objects.filter(computed_at__lt=started).delete()
+    return size, stored
@@ -8,6 +8,9 @@ urlpatterns = [
     path('decline/<int:friendship_id>/', views.decline_friend_request, name='decline_friend_request'),
     path('remove/<int:user_id>/', views.remove_friend, name='remove_friend'),
     path('search/', views.search_users, name='search_users'),
+    path('autocomplete/', views.friend_autocomplete, name='friend_autocomplete'),
+    path('suggestions/', views.friend_suggestions, name='friend_suggestions'),
     path('invite_friend/', views.invite_friend, name='invite_friend'),
     path('friend/<int:friend_id>/', views.friend_calendar_view, name='friend_calendar'),
+    path('overlay/', views.friends_overlay_view, name='friends_overlay'),
 ]
\ No newline at end of file
@@ -1,42 +1,82 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from django.contrib.auth.decorators import login_required
+from calendar_app.ratelimit import ratelimit
 from django.core.mail import send_mail
 from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
 from django.utils.timezone import localdate
-from events.models import EventInvitation, Event
-from friends.models import Friendship
-from django.db.models import Q
+from events.archive import reaches_archive
+from events.models import ArchivedEvent, ArchivedEventInvitation, EventInvitation, Event
+from friends.models import Friendship, FriendSuggestion, friends_of
+from groups.models import Group
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Exists, F, Func, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from groups.models import Group
+from jobs.queue import enqueue
 
 # Create your views here.
 User = get_user_model()
 
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+def _count(queryset):
+    # Correlated COUNT subquery, only evaluated for the rows that are selected
+    return Coalesce(Subquery(
+        queryset.order_by().annotate(n=Func(F('pk'), function='COUNT')).values('n'),
+        output_field=IntegerField(),
+    ), 0)
+
+
 @login_required
 def friend_list(request):
-    accepted_friendships = Friendship.objects.filter(
-        (Q(from_user=request.user) | Q(to_user=request.user)),
-        is_accepted=True
+    accepted = Friendship.objects.filter(is_accepted=True)
+
+    # The other side of each friendship is resolved in SQL, counts and the next
+    # shared event are subqueries per friend on the current page
+    friend_ids = friends_of(request.user).values('pk')
+    mutual_friends = accepted.filter(
+        Q(from_user=OuterRef('pk'), to_user__in=friend_ids) |
+        Q(to_user=OuterRef('pk'), from_user__in=friend_ids)
+    )
+    shared_groups = Group.objects.filter(members=OuterRef('pk')).filter(members=request.user)
+    # Same rules as EventQuerySet.on_calendar_of, for the friend of the outer row
+    invitations = EventInvitation.objects.filter(event=OuterRef('pk'))
+    accepted_invitations = invitations.filter(status='accepted')
+    on_friends_calendar = (
+        Q(created_by=OuterRef('pk')) & (~Exists(invitations) | Exists(accepted_invitations)) |
+        Exists(accepted_invitations.filter(user=OuterRef(OuterRef('pk'))))
+    )
+    next_shared_event = (
+        Event.objects.on_calendar_of(request.user)
+        .filter(on_friends_calendar, start_time__gte=timezone.now())
+        .order_by('start_time', 'id')
+        .values('id')[:1]
     )
 
-    friends = []
-    friend_ids = []
+    friends = (
+        friends_of(request.user)
+        .annotate(
+            mutual_friends=_count(mutual_friends),
+            shared_groups=_count(shared_groups),
+            next_shared_event_id=Subquery(next_shared_event),
+        )
+        .order_by('first_name', 'last_name', 'username')
+    )
+    page = Paginator(friends, 20).get_page(request.GET.get('page'))
 
-    for f in accepted_friendships:
-        if f.from_user == request.user:
-            friends.append(f.to_user)
-            friend_ids.append(f.to_user.id)
-        else:
-            friends.append(f.from_user)
-            friend_ids.append(f.from_user.id)
+    shared_events = Event.objects.in_bulk([f.next_shared_event_id for f in page if f.next_shared_event_id])
+    for friend in page:
+        friend.next_shared_event = shared_events.get(friend.next_shared_event_id)
 
-    received_requests = Friendship.objects.filter(to_user=request.user, is_accepted=False)
+    received_requests = Friendship.objects.filter(to_user=request.user, is_accepted=False).select_related('from_user')
 
     return render(request, 'friends/friend_list.html', {
-        'friends': friends,
+        'page': page,
         'received_requests': received_requests
     })
 
@@ -80,38 +120,22 @@ def decline_friend_request(request, friendship_id):
 def remove_friend(request, user_id):
     friend = get_object_or_404(User, id=user_id)
 
-    Friendship.objects.filter(
-        Q(from_user=request.user, to_user=friend) |
-        Q(from_user=friend, to_user=request.user)
-    ).delete()
-
-    groups = Group.objects.filter(created_by=request.user, members=friend)
-    for g in groups:
-        g.members.remove(friend)
-
-    for event in Event.objects.filter(created_by=request.user, visible_to_friends=friend):
-        event.visible_to_friends.remove(friend)
-
-    for event in Event.objects.filter(created_by=request.user, visible_to_groups__members=friend).distinct():
-        event.visible_to_groups.remove(*event.visible_to_groups.filter(members=friend))
-
-    invitations = EventInvitation.objects.filter(event__created_by=request.user, user=friend)
-
-    for invitation in invitations:
-        event = invitation.event
-        other_invitations = EventInvitation.objects.filter(event=event).exclude(user=friend)
-        if not other_invitations.exists():
-            event.delete()
-        else:
-            invitation.delete()
-
-    EventInvitation.objects.filter(event__created_by=friend, user=request.user).delete()
+    # Groups, visibility and invitations are cleaned up by friends.jobs
+    with transaction.atomic():
+        Friendship.objects.filter(
+            Q(from_user=request.user, to_user=friend) |
+            Q(from_user=friend, to_user=request.user)
+        ).delete()
+        enqueue('friends.clean_up_unfriended', user_id=request.user.id, friend_id=friend.id)
 
     messages.info(request, f"You unfriended {friend.username}.")
     return redirect('friend_list')
 
 
+# Called on every keystroke of the friend search box, limited per worker to
+# keep the database out of the limit
 @login_required
+@ratelimit('2/s', burst=20, cache='ratelimit')
 def search_users(request):
     q = request.GET.get('q', '')
     users = User.objects.filter(username__icontains=q).exclude(id=request.user.id)[:10]
@@ -120,6 +144,54 @@ def search_users(request):
 
 
 @login_required
+def friend_autocomplete(request):
+    # Prefix search over the user's friends for the member and invite pickers
+    q = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    friends = friends_of(request.user)
+    if q:
+        friends = friends.filter(Q(username__istartswith=q) | Q(first_name__istartswith=q) | Q(last_name__istartswith=q))
+
+    start = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    users = list(friends.order_by('username')[start:start + AUTOCOMPLETE_PAGE_SIZE + 1])
+
+    return JsonResponse({
+        'results': [
+            {'id': u.id, 'label': f"{u.first_name} {u.last_name} ({u.username})"}
+            for u in users[:AUTOCOMPLETE_PAGE_SIZE]
+        ],
+        'has_more': len(users) > AUTOCOMPLETE_PAGE_SIZE,
+    })
+
+
+@login_required
+def friend_suggestions(request):
+    # Stored by compute_friend_suggestions, people befriended or asked since
+    # the last run are left out
+    connected = Friendship.objects.filter(
+        Q(from_user=request.user, to_user=OuterRef('suggested_user')) |
+        Q(from_user=OuterRef('suggested_user'), to_user=request.user)
+    )
+    suggestions = (
+        FriendSuggestion.objects.filter(user=request.user)
+        .exclude(Exists(connected))
+        .select_related('suggested_user')
+        .order_by('-mutual_friends', 'suggested_user_id')[:10]
+    )
+    data = [
+        {'id': s.suggested_user.id, 'username': s.suggested_user.username, 'mutual_friends': s.mutual_friends}
+        for s in suggestions
+    ]
+    return JsonResponse(data, safe=False)
+
+
+# Every invitation is an email to an address that is not ours
+@login_required
+@ratelimit('10/h', burst=5, methods=['POST'])
 def invite_friend(request):
     if request.method == 'POST':
         email = request.POST.get('email')
@@ -167,19 +239,29 @@ def friend_calendar_view(request, friend_id):
     prev_week = week_offset - 1
     next_week = week_offset + 1
 
-    events = Event.objects.filter(
+    events = list(Event.objects.filter(
         Q(created_by=friend, invitations__isnull=True) |
         Q(created_by=friend, invitations__status='accepted') |
         Q(invitations__user=friend, invitations__status='accepted')
     ).filter(
         start_time__date__gte=start_of_week,
         start_time__date__lt=end_of_week,
-    ).distinct()
+    ).distinct())
+
+    week_start = timezone.make_aware(datetime.combine(start_of_week, time.min))
+    if reaches_archive(week_start):
+        events += ArchivedEvent.objects.on_calendar_of(friend).filter(
+            start_time__date__gte=start_of_week,
+            start_time__date__lt=end_of_week,
+        )
 
     days = []
     for i in range(7):
         day_date = start_of_week + timedelta(days=i)
-        day_events = events.filter(start_time__date=day_date)
+        day_events = sorted(
+            (e for e in events if localdate(e.start_time) == day_date),
+            key=lambda e: e.start_time,
+        )
 
         formatted_events = []
         for e in day_events:
@@ -188,12 +270,13 @@ def friend_calendar_view(request, friend_id):
 
             start_offset = (start_minutes / 10) * 10
             duration_height = ((end_minutes - start_minutes) / 10) * 10
+            visible = e.can_user_view(request.user)
 
             formatted_events.append({
                 "id": e.id,
-                "title": e.title if e.can_user_view(request.user) else "",
-                "tag": e.tag if e.can_user_view(request.user) else "hidden",
-                "visible": e.can_user_view(request.user),
+                "title": e.title if visible else "",
+                "tag": e.tag if visible else "hidden",
+                "visible": visible,
                 "start_offset": start_offset,
                 "duration_height": duration_height,
             })
@@ -212,4 +295,92 @@ def friend_calendar_view(request, friend_id):
         "prev_week": prev_week,
         "next_week": next_week,
         "hours": range(0, 24),
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+def friends_overlay_view(request):
+    friend_ids = [i for i in request.GET.getlist('friends') if i.isdigit()]
+    friendship = Friendship.objects.filter(
+        Q(from_user=request.user, to_user=OuterRef('pk')) | Q(to_user=request.user, from_user=OuterRef('pk')),
+        is_accepted=True,
+    )
+    friends = list(User.objects.filter(Exists(friendship), id__in=friend_ids).order_by('first_name', 'last_name'))
+
+    if not friends:
+        messages.error(request, "Select at least one friend to compare.")
+        return redirect('friend_list')
+
+    lanes = {friend.id: lane for lane, friend in enumerate(friends)}
+    lane_width = 95 / len(friends)
+
+    week_offset = int(request.GET.get("week", 0))
+
+    today = localdate()
+    start_of_week = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+    end_of_week = start_of_week + timedelta(days=7)
+
+    # One query for the week of every selected friend with visibility resolved
+    # in the database, plus one for the acceptances that make a friend an owner
+    # (both repeated on the archive tables for archived weeks)
+    week_start = timezone.make_aware(datetime.combine(start_of_week, time.min))
+    week_end = timezone.make_aware(datetime.combine(end_of_week, time.min))
+    sources = [(Event, EventInvitation)]
+    if reaches_archive(week_start):
+        sources.append((ArchivedEvent, ArchivedEventInvitation))
+
+    events = []
+    for event_model, invitation_model in sources:
+        events += (
+            event_model.objects.on_calendar_of(*friends)
+            .filter(start_time__gte=week_start, start_time__lt=week_end)
+            .annotate(visible=Exists(event_model.objects.visible_to(request.user).filter(pk=OuterRef('pk'))))
+            .prefetch_related(Prefetch(
+                'invitations',
+                queryset=invitation_model.objects.filter(status='accepted', user__in=friends),
+                to_attr='friend_acceptances',
+            ))
+            .order_by('start_time')
+        )
+
+    days = [{"date": start_of_week + timedelta(days=i), "events": []} for i in range(7)]
+    for e in events:
+        start = timezone.localtime(e.start_time)
+        end = timezone.localtime(e.end_time)
+        start_minutes = start.hour * 60 + start.minute
+        end_minutes = end.hour * 60 + end.minute if end.date() == start.date() else 24 * 60
+
+        owner_ids = {i.user_id for i in e.friend_acceptances}
+        if e.created_by_id in lanes:
+            owner_ids.add(e.created_by_id)
+
+        for owner in friends:
+            if owner.id not in owner_ids:
+                continue
+
+            days[(start.date() - start_of_week).days]["events"].append({
+                "id": e.id,
+                "title": e.title if e.visible else "",
+                "tag": e.tag if e.visible else "hidden",
+                "visible": e.visible,
+                "owner": owner,
+                "lane": lanes[owner.id],
+                "lane_offset": lanes[owner.id] * lane_width,
+                "lane_width": lane_width,
+                "start_offset": start_minutes,
+                "duration_height": end_minutes - start_minutes,
+            })
+
+    for day in days:
+        day["weekday"] = day["date"].strftime("%A")
+
+    return render(request, "friends/friends_overlay.html", {
+        "friends": friends,
+        "days": days,
+        "week_start": start_of_week,
+        "week_end": end_of_week - timedelta(days=1),
+        "prev_week": week_offset - 1,
+        "next_week": week_offset + 1,
+        "friend_query": "&".join(f"friends={friend.id}" for friend in friends),
+        "hours": range(0, 24),
+    })
@@ -1,7 +1,6 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from friends.models import Friendship
+from friends.models import friends_of
 from groups.models import Group
 
 # Create your forms here.
@@ -17,14 +16,5 @@ class GroupForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if user:
-            friends = Friendship.objects.filter(
-                (Q(from_user=user) | Q(to_user=user)),
-                is_accepted=True
-            )
-
-            friend_ids = [
-                f.from_user.id if f.to_user == user else f.to_user.id
-                for f in friends
-            ]
-
-            self.fields['members'].queryset = User.objects.filter(Q(id__in=friend_ids) | Q(id=user.id))
\ No newline at end of file
+            # Lazy, submitted members are checked with one id__in query
+            self.fields['members'].queryset = friends_of(user) | User.objects.filter(id=user.id)
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_remove_group_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
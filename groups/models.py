@@ -3,7 +3,7 @@ from django.conf import settings
 
 # Create your models here.
 class Group(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='groups_created')
     members = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='group_membership', blank=True)
 
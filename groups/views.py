@@ -1,17 +1,20 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q
+from django.db import transaction
+from django.http import JsonResponse
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from calendar_app.models import CustomUser
-from events.models import EventInvitation, Event
-from friends.models import Friendship
+from django.utils import timezone
+from events.models import EventInvitation
 from groups.forms import GroupForm
 from groups.models import Group
+from jobs.queue import enqueue
 
 # Create your views here.
 User = get_user_model()
 
+AUTOCOMPLETE_PAGE_SIZE = 20
+
 @login_required
 def group_list(request):
     user_groups = Group.objects.filter(created_by=request.user)
@@ -36,16 +39,6 @@ def group_details(request, group_id):
 
 @login_required
 def add_group(request):
-    friends = Friendship.objects.filter(
-        (Q(from_user=request.user) | Q(to_user=request.user)),
-        is_accepted=True
-    )
-
-    friend_users = [
-        f.from_user if f.to_user == request.user else f.to_user
-        for f in friends
-    ]
-
     if request.method == 'POST':
         form = GroupForm(request.POST, user=request.user)
         if form.is_valid():
@@ -61,7 +54,6 @@ def add_group(request):
 
     return render(request, 'groups/add_group.html', {
         'form': form,
-        'friend_users': friend_users
     })
 
 
@@ -82,25 +74,36 @@ def edit_group(request, group_id):
     else:
         form = GroupForm(instance=group, user=request.user)
 
-    friendships = Friendship.objects.filter(
-        (Q(from_user=request.user) | Q(to_user=request.user)),
-        is_accepted=True
-    )
-
-    friend_ids = [
-        f.from_user.id if f.to_user == request.user else f.to_user.id
-        for f in friendships
-    ]
-
-    friends = CustomUser.objects.filter(id__in=friend_ids)
+    # Friends to add are searched through friend_autocomplete
     selected_members = group.members.all()
-    available_friends = friends.exclude(id__in=selected_members.values_list('id', flat=True))
 
     return render(request, 'groups/edit_group.html', {
         'form': form,
         'group': group,
         'selected_members': selected_members,
-        'available_friends': available_friends,
+    })
+
+
+@login_required
+def group_autocomplete(request):
+    # Prefix search over the groups the user created, for the invite and
+    # visibility pickers
+    q = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    groups = Group.objects.filter(created_by=request.user)
+    if q:
+        groups = groups.filter(name__istartswith=q)
+
+    start = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    groups = list(groups.order_by('name', 'id')[start:start + AUTOCOMPLETE_PAGE_SIZE + 1])
+
+    return JsonResponse({
+        'results': [{'id': g.id, 'label': g.name} for g in groups[:AUTOCOMPLETE_PAGE_SIZE]],
+        'has_more': len(groups) > AUTOCOMPLETE_PAGE_SIZE,
     })
 
 
@@ -109,16 +112,16 @@ def delete_group(request, group_id):
     group = get_object_or_404(Group, id=group_id, created_by=request.user)
 
     invitations_to_group = EventInvitation.objects.filter(event__created_by=request.user, group=group)
-    if invitations_to_group.exists():
-        events_to_delete = Event.objects.filter(id__in=invitations_to_group.values_list('event_id', flat=True)).distinct()
-        events_to_delete.delete()
-
-    events = Event.objects.filter(created_by=request.user)
-    for event in events:
-        if group in event.visible_to_groups.all():
-            event.visible_to_groups.remove(group)
-
-    group.delete()
+    event_ids = list(invitations_to_group.values_list('event_id', flat=True).distinct())
+
+    # The group goes away now, the events it was invited to are deleted by
+    # events.jobs in batches. Detaching their invitations keeps group.delete()
+    # from cascading into them here; visible_to_groups rows go with the group
+    with transaction.atomic():
+        if event_ids:
+            invitations_to_group.update(group=None, updated_at=timezone.now())
+            enqueue('events.delete_events', event_ids=event_ids)
+        group.delete()
 
     messages.success(request, "Group deleted successfully.")
     return redirect('group_list')
\ No newline at end of file
@@ -0,0 +1,18 @@
+import os
+import shutil
+import tempfile
+
+# Workers write their metrics to files in this directory, /metrics merges them
+# (see monitoring.metrics). Set here so every forked worker inherits it
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'calendar-metrics'))
+
+
+def on_starting(server):
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,65 @@
+import logging
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+from jobs.queue import claim, run
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs until stopped (SIGINT/SIGTERM)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help="Number of jobs run at the same time, each in its own thread and connection.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait before looking again when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty instead of waiting for new jobs.")
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        self.counts = {'done': 0, 'failed': 0}
+        self.lock = threading.Lock()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stopping.set())
+
+        workers = [
+            threading.Thread(target=self.work, args=(options['poll_interval'], options['once']), daemon=True)
+            for _ in range(max(options['concurrency'], 1))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(timeout=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {self.counts['done']} job(s), {self.counts['failed']} failed."
+        ))
+
+    def work(self, poll_interval, once):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = claim()
+                except DatabaseError:
+                    logger.exception("Could not claim a job")
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                if job is None:
+                    if once:
+                        break
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                result = 'done' if run(job) else 'failed'
+                with self.lock:
+                    self.counts[result] += 1
+        finally:
+            connection.close()
@@ -0,0 +1,76 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from jobs.models import Job
+from monitoring.tracing import current_traceparent, trace
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def job(name):
+    # Registers a handler, handlers live in <app>/jobs.py and must be idempotent:
+    # a job whose worker died is picked up again after JOBS_LOCK_TIMEOUT
+    def register(func):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    # Inside the caller's transaction, so the job only exists if the
+    # synchronous part of the work was committed
+    return Job.objects.create(name=name, payload=payload, traceparent=current_traceparent())
+
+
+def claim():
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', run_after__lte=now) | Q(status='running', locked_at__lt=stale))
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        Job.objects.filter(id=job.id).update(status='running', locked_at=now, attempts=F('attempts') + 1)
+
+    job.status = 'running'
+    job.locked_at = now
+    job.attempts += 1
+    return job
+
+
+def run(job):
+    # Finished jobs are deleted, failed ones are retried with exponential
+    # backoff and kept as 'failed' after JOBS_MAX_ATTEMPTS
+    claimed = Job.objects.filter(id=job.id, locked_at=job.locked_at)
+
+    try:
+        handler = _handlers[job.name]
+        with trace(f"job {job.name}", parent=job.traceparent, kind='consumer', job_id=job.id, attempt=job.attempts):
+            handler(**job.payload)
+    except Exception:
+        logger.exception("Job %s failed", job)
+        if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            claimed.update(status='failed', locked_at=None, last_error=traceback.format_exc())
+        else:
+            claimed.update(
+                status='pending',
+                locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=30 * 2 ** job.attempts),
+                last_error=traceback.format_exc(),
+            )
+        return False
+
+    claimed.delete()
+    return True
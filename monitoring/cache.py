@@ -0,0 +1,53 @@
+from django.core.cache.backends import db, locmem
+from monitoring.metrics import CACHE_REQUESTS
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    # Counts hits and misses of get()/get_many(), labelled with the cache's
+    # METRICS_NAME (defaults to 'default'). The backends implement one through
+    # the other (LocMemCache.get_many loops over get, DatabaseCache.get calls
+    # get_many), so only the outermost call counts. Cache objects are per
+    # thread, the flag needs no lock.
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.metrics_name = params.get('METRICS_NAME', 'default')
+        self._counting = False
+
+    def _count(self, hits, misses):
+        if hits:
+            CACHE_REQUESTS.labels(self.metrics_name, 'hit').inc(hits)
+        if misses:
+            CACHE_REQUESTS.labels(self.metrics_name, 'miss').inc(misses)
+
+    def get(self, key, default=None, version=None):
+        if self._counting:
+            return super().get(key, default, version=version)
+        self._counting = True
+        try:
+            value = super().get(key, _missing, version=version)
+        finally:
+            self._counting = False
+        self._count(value is not _missing, value is _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        if self._counting:
+            return super().get_many(keys, version=version)
+        keys = list(keys)
+        self._counting = True
+        try:
+            found = super().get_many(keys, version=version)
+        finally:
+            self._counting = False
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class DatabaseCache(InstrumentedCacheMixin, db.DatabaseCache):
+    pass
@@ -0,0 +1,40 @@
+import time
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from monitoring.metrics import EMAIL_FAILURES, EMAIL_LATENCY, EMAILS_SENT
+from monitoring.tracing import span
+
+
+class EmailBackend(BaseEmailBackend):
+    # Wraps the backend named by EMAIL_DELIVERY_BACKEND and records how long
+    # sending takes and how many emails fail
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.backend = get_connection(settings.EMAIL_DELIVERY_BACKEND, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            with span('mail.send', 'client', backend=settings.EMAIL_DELIVERY_BACKEND, messages=len(email_messages)):
+                sent = self.backend.send_messages(email_messages) or 0
+        except Exception:
+            EMAIL_FAILURES.inc(len(email_messages))
+            raise
+        finally:
+            EMAIL_LATENCY.observe(time.perf_counter() - start)
+
+        EMAILS_SENT.inc(sent)
+        if sent < len(email_messages):
+            # fail_silently backends report failures by sending fewer
+            EMAIL_FAILURES.inc(len(email_messages) - sent)
+        return sent
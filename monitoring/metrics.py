@@ -0,0 +1,65 @@
+import os
+from django.db.models import Count, Min
+from django.utils import timezone
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes
+# its samples to files there and /metrics merges them at scrape time
+
+REQUEST_LATENCY = Histogram(
+    'calendar_http_request_duration_seconds',
+    'Time spent handling a request, by URL name.',
+    ['view', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_QUERIES = Histogram(
+    'calendar_http_request_db_queries',
+    'Database queries run while handling a request, by URL name.',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500),
+)
+EMAIL_LATENCY = Histogram(
+    'calendar_email_send_duration_seconds',
+    'Time spent handing a batch of emails to the delivery backend.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EMAILS_SENT = Counter('calendar_emails_sent_total', 'Emails accepted by the delivery backend.')
+EMAIL_FAILURES = Counter('calendar_email_failures_total', 'Emails the delivery backend failed to send.')
+CACHE_REQUESTS = Counter(
+    'calendar_cache_requests_total',
+    'Cache lookups by cache and result (hit or miss).',
+    ['cache', 'result'],
+)
+
+
+class JobQueueCollector:
+    # Queue depth read from the jobs table when scraped, so it is the same
+    # whichever worker answers
+    def collect(self):
+        from jobs.models import Job
+
+        jobs = GaugeMetricFamily('calendar_jobs', 'Background jobs by status.', labels=['status'])
+        counts = dict(Job.objects.order_by().values_list('status').annotate(n=Count('id')))
+        for status, _ in Job.STATUS_CHOICES:
+            jobs.add_metric([status], counts.get(status, 0))
+        yield jobs
+
+        oldest = Job.objects.filter(status='pending', run_after__lte=timezone.now()).aggregate(oldest=Min('run_after'))['oldest']
+        yield GaugeMetricFamily(
+            'calendar_jobs_oldest_pending_seconds',
+            'Age of the oldest job waiting for a worker.',
+            value=(timezone.now() - oldest).total_seconds() if oldest else 0,
+        )
+
+
+def exposition():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    queue = CollectorRegistry()
+    queue.register(JobQueueCollector())
+    return generate_latest(registry) + generate_latest(queue)
@@ -0,0 +1,63 @@
+import time
+from django.db import connection
+from monitoring.metrics import REQUEST_LATENCY, REQUEST_QUERIES
+from monitoring.queries import normalize_sql, observe_slow_queries
+from monitoring.tracing import span, trace
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def metrics_middleware(get_response):
+    def middleware(request):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = get_response(request)
+        duration = time.perf_counter() - start
+
+        # URL names keep the label set small, unknown paths share one label
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+
+        REQUEST_LATENCY.labels(view, method, response.status_code).observe(duration)
+        REQUEST_QUERIES.labels(view).observe(queries)
+        return response
+
+    return middleware
+
+
+def slow_query_middleware(get_response):
+    def middleware(request):
+        with observe_slow_queries(request):
+            return get_response(request)
+
+    return middleware
+
+
+def _trace_query(execute, sql, params, many, context):
+    with span('db.query', 'client', statement=normalize_sql(sql), many=many):
+        return execute(sql, params, many, context)
+
+
+def tracing_middleware(get_response):
+    def middleware(request):
+        with trace(f"{request.method} {request.path}", method=request.method, path=request.path) as root:
+            if root is None:
+                return get_response(request)
+
+            with connection.execute_wrapper(_trace_query):
+                response = get_response(request)
+
+            if request.resolver_match:
+                root.name = request.resolver_match.view_name
+            root.set(status=response.status_code)
+            return response
+
+    return middleware
@@ -0,0 +1,108 @@
+import random
+import re
+import threading
+import traceback
+from collections import deque
+from pathlib import Path
+from time import perf_counter
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+# Slow queries of this process, newest last. Each worker keeps its own buffer
+_slow_queries = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+_lock = threading.Lock()
+
+_project_root = str(Path(settings.BASE_DIR).resolve())
+_monitoring_root = str(Path(__file__).resolve().parent)
+
+_in_list = re.compile(r'\bIN \((?:\s*%s\s*,)*\s*%s\s*\)', re.IGNORECASE)
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_spaces = re.compile(r'\s+')
+# Reads that still lock rows, notify listeners or write in a CTE
+_side_effects = re.compile(r'\bFOR (?:NO KEY )?(?:UPDATE|SHARE)\b|\bFOR KEY SHARE\b|\bpg_notify\s*\(|\bpg_advisory|'
+                           r'\bnextval\s*\(|\b(?:INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    # Queries that differ only in values or IN-list length share one form
+    sql = _literals.sub('%s', sql)
+    sql = _in_list.sub('IN (...)', sql)
+    return _spaces.sub(' ', sql.replace('%s', '?')).strip()
+
+
+def _calling_frame():
+    # Innermost frame in our own code, i.e. the view or helper running the query
+    for frame in reversed(traceback.extract_stack()):
+        path = frame.filename
+        if path.startswith(_project_root) and not path.startswith(_monitoring_root) and 'site-packages' not in path:
+            return f"{Path(path).relative_to(_project_root)}:{frame.lineno} in {frame.name}"
+    return ''
+
+
+def recent_slow_queries():
+    with _lock:
+        return list(reversed(_slow_queries))
+
+
+class SlowQueryObserver:
+    # connection.execute_wrapper hook, records queries slower than
+    # SLOW_QUERY_THRESHOLD_MS and explains a sample of them
+    def __init__(self, request=None):
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+
+        start = perf_counter()
+        result = execute(sql, params, many, context)
+        duration = (perf_counter() - start) * 1000
+
+        if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.record(sql, params, many, context['connection'], duration)
+        return result
+
+    def record(self, sql, params, many, conn, duration):
+        match = self.request.resolver_match if self.request else None
+        entry = {
+            'at': timezone.now(),
+            'duration_ms': round(duration, 1),
+            'sql': normalize_sql(sql),
+            'view': match.view_name if match else '',
+            'path': f"{self.request.method} {self.request.path}" if self.request else '',
+            'frame': _calling_frame(),
+            'plan': None,
+        }
+        if not many and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+            entry['plan'] = self.explain(sql, params, conn)
+
+        with _lock:
+            _slow_queries.append(entry)
+
+    def explain(self, sql, params, conn):
+        # ANALYZE runs the statement again, so only reads are explained, and
+        # reads with side effects only get the plan without running them
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+
+        if conn.vendor == 'postgresql' and not _side_effects.search(_literals.sub('', sql)):
+            prefix = conn.ops.explain_query_prefix(analyze=True, buffers=True)
+        else:
+            prefix = conn.ops.explain_query_prefix()
+
+        self.explaining = True
+        try:
+            # A failing EXPLAIN must not abort the request's transaction
+            with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+        except DatabaseError as exc:
+            return f"EXPLAIN failed: {exc}"
+        finally:
+            self.explaining = False
+
+
+def observe_slow_queries(request=None):
+    return connection.execute_wrapper(SlowQueryObserver(request))
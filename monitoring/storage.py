@@ -0,0 +1,16 @@
+from cloudinary_storage.storage import MediaCloudinaryStorage as BaseMediaCloudinaryStorage
+from monitoring.tracing import span
+
+
+class TracedStorageMixin:
+    def save(self, name, content, max_length=None):
+        with span('storage.save', 'client', storage=type(self).__name__, name=name):
+            return super().save(name, content, max_length=max_length)
+
+    def delete(self, name):
+        with span('storage.delete', 'client', storage=type(self).__name__, name=name):
+            return super().delete(name)
+
+
+class MediaCloudinaryStorage(TracedStorageMixin, BaseMediaCloudinaryStorage):
+    pass
@@ -0,0 +1,21 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+from monitoring.tracing import span
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        with span('template.render', template=self.origin.template_name or '<string>'):
+            return super().render(context, request)
+
+
+# DjangoTemplates whose templates record a span per render
+class DjangoTemplates(django.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
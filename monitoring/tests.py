@@ -0,0 +1,28 @@
+from django.test import TestCase
+from monitoring.cache import DatabaseCache, LocMemCache
+from monitoring.metrics import CACHE_REQUESTS
+
+
+class InstrumentedCacheTests(TestCase):
+    def counts(self, cache):
+        return tuple(CACHE_REQUESTS.labels(cache.metrics_name, result)._value.get() for result in ('hit', 'miss'))
+
+    def assert_counts_each_lookup_once(self, cache):
+        cache.set('present', 1)
+
+        before = self.counts(cache)
+        self.assertEqual(cache.get('present'), 1)
+        self.assertIsNone(cache.get('absent'))
+        hits, misses = self.counts(cache)
+        self.assertEqual((hits - before[0], misses - before[1]), (1, 1))
+
+        before = self.counts(cache)
+        self.assertEqual(cache.get_many(['present', 'absent', 'other']), {'present': 1})
+        hits, misses = self.counts(cache)
+        self.assertEqual((hits - before[0], misses - before[1]), (1, 2))
+
+    def test_locmem_cache_counts_each_lookup_once(self):
+        self.assert_counts_each_lookup_once(LocMemCache('metrics-tests', {'METRICS_NAME': 'test-locmem'}))
+
+    def test_database_cache_counts_each_lookup_once(self):
+        self.assert_counts_each_lookup_once(DatabaseCache('calendar_throttle_cache', {'METRICS_NAME': 'test-db'}))
@@ -0,0 +1,216 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Spans are only collected for sampled traces, everywhere else span() is a
+# context variable lookup
+_trace = contextvars.ContextVar('trace', default=None)
+_span = contextvars.ContextVar('span', default=None)
+
+_traceparent = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-01$')
+
+KINDS = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+
+
+class Span:
+    def __init__(self, trace, name, kind, parent_id, attributes):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.start,
+            'end': self.end,
+            'duration_ms': round((self.end - self.start) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+
+
+def _open_span(trace, name, kind, parent_id, attributes):
+    current = Span(trace, name, kind, parent_id, attributes)
+    return current, _span.set(current)
+
+
+def _close_span(current, token, error=None):
+    if error is not None:
+        current.error = f"{type(error).__name__}: {error}"
+    current.end = time.time_ns()
+    _span.reset(token)
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _span.get()
+    current, token = _open_span(trace, name, kind, parent.span_id if parent else None, attributes)
+    try:
+        yield current
+    except BaseException as exc:
+        _close_span(current, token, exc)
+        raise
+    _close_span(current, token)
+
+
+@contextmanager
+def trace(name, parent=None, kind='server', **attributes):
+    # Starts a trace, or continues the one of a traceparent string handed over
+    # by current_traceparent(). Spans are exported when the block exits
+    if _trace.get() is not None:
+        with span(name, kind, **attributes) as current:
+            yield current
+        return
+
+    match = _traceparent.match(parent or '')
+    if match:
+        trace_id, parent_id = match.groups()
+    elif random.random() < settings.TRACING_SAMPLE_RATE:
+        trace_id, parent_id = secrets.token_hex(16), None
+    else:
+        yield None
+        return
+
+    current_trace = Trace(trace_id)
+    trace_token = _trace.set(current_trace)
+    root, span_token = _open_span(current_trace, name, kind, parent_id, attributes)
+    try:
+        yield root
+    except BaseException as exc:
+        _close_span(root, span_token, exc)
+        raise
+    else:
+        _close_span(root, span_token)
+    finally:
+        _trace.reset(trace_token)
+        try:
+            get_exporter().export([s.as_dict() for s in current_trace.spans])
+        except Exception:
+            logger.exception("Exporting trace %s failed", trace_id)
+
+
+def current_traceparent():
+    # W3C traceparent of the active span, '' when the work is not traced
+    current = _span.get()
+    if current is None:
+        return ''
+    return f"00-{current.trace.trace_id}-{current.span_id}-01"
+
+
+# One JSON object per span, appended with a single write so lines of
+# different worker processes do not interleave
+class JsonLinesExporter:
+    def __init__(self, path=None):
+        self.path = path or settings.TRACING_JSONL_PATH
+
+    def export(self, spans):
+        data = ''.join(json.dumps(s, separators=(',', ':'), default=str) + '\n' for s in spans).encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+# Sends traces as OTLP/HTTP JSON (e.g. to an OpenTelemetry collector or Jaeger
+# on localhost:4318). Posting happens on a background thread, traces are
+# dropped when the collector cannot keep up
+class CollectorExporter:
+    def __init__(self, url=None, max_queue_size=1000, timeout=5):
+        self.url = url or settings.TRACING_COLLECTOR_URL
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._sender = None
+
+    def export(self, spans):
+        with self._lock:
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(target=self._send, name='trace-exporter', daemon=True)
+                self._sender.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("Trace exporter queue is full, dropping a trace")
+
+    def _send(self):
+        while True:
+            body = json.dumps(self.otlp(self._queue.get())).encode()
+            request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except Exception:
+                logger.warning("Sending a trace to %s failed", self.url, exc_info=True)
+
+    def otlp(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': settings.TRACING_SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [{
+                    'traceId': s['trace_id'],
+                    'spanId': s['span_id'],
+                    'parentSpanId': s['parent_id'] or '',
+                    'name': s['name'],
+                    'kind': KINDS[s['kind']],
+                    'startTimeUnixNano': str(s['start']),
+                    'endTimeUnixNano': str(s['end']),
+                    'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in s['attributes'].items()],
+                    'status': {'code': 2, 'message': s['error']} if s['error'] else {'code': 0},
+                } for s in spans],
+            }],
+        }]}
+
+
+@lru_cache(maxsize=None)
+def get_exporter():
+    return import_string(settings.TRACING_EXPORTER)()
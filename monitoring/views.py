@@ -0,0 +1,31 @@
+import hmac
+from django.conf import settings
+from django.contrib import admin
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from prometheus_client import CONTENT_TYPE_LATEST
+from monitoring.metrics import exposition
+from monitoring.queries import recent_slow_queries
+
+# Create your views here.
+def metrics(request):
+    # Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>",
+    # without a token configured the endpoint only exists in DEBUG
+    token = settings.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        raise Http404
+
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE_LATEST)
+
+
+# Staff only, wrapped in admin.site.admin_view in Diplomska/urls.py
+def slow_queries(request):
+    return render(request, 'monitoring/slow_queries.html', {
+        **admin.site.each_context(request),
+        'title': 'Slow queries',
+        'queries': recent_slow_queries(),
+        'threshold': settings.SLOW_QUERY_THRESHOLD_MS,
+    })
@@ -0,0 +1,7 @@
+setTimeout(() => {
+    document.querySelectorAll('.alert').forEach(el => {
+        el.style.transition = "opacity 0.5s";
+        el.style.opacity = "0";
+        setTimeout(() => el.remove(), 500);
+    });
+}, 5000);
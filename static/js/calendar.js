@@ -0,0 +1,24 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const today = new Date();
+    const todayStr = today.toISOString().split('T')[0];
+    const todayCol = document.querySelector(`.calendar-day-column[data-date="${todayStr}"]`);
+
+    if (todayCol) {
+        const line = document.createElement('div');
+        const dot = document.createElement('div');
+        line.classList.add('current-time-line');
+        dot.classList.add('current-time-dot');
+        todayCol.appendChild(line);
+        todayCol.appendChild(dot);
+
+        function updateLinePosition() {
+            const now = new Date();
+            const currentMinutes = now.getHours() * 60 + now.getMinutes();
+            line.style.top = `${currentMinutes}px`;
+            dot.style.top = `${currentMinutes}px`;
+        }
+
+        updateLinePosition();
+        setInterval(updateLinePosition, 30000);
+    }
+});
@@ -0,0 +1,10 @@
+document.getElementById('visibility').addEventListener('change', function() {
+    document.getElementById('customVisibilityOptions').style.display =
+        this.value === 'custom' ? 'block' : 'none';
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    const select = document.getElementById('visibility');
+    const customSection = document.getElementById('customVisibilityOptions');
+    customSection.style.display = select.value === 'custom' ? 'block' : 'none';
+});
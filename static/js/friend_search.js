@@ -0,0 +1,56 @@
+document.addEventListener("DOMContentLoaded", function() {
+    const searchInput = document.getElementById("friendSearchInput");
+    const resultsList = document.getElementById("friendSearchResults");
+
+    function showUsers(data, emptyText) {
+        resultsList.innerHTML = "";
+        if (data.length === 0) {
+            resultsList.innerHTML = `<li class='list-group-item'>${emptyText}</li>`;
+        } else {
+            data.forEach(user => {
+                const li = document.createElement("li");
+                li.classList.add("list-group-item", "d-flex", "justify-content-between", "align-items-center");
+
+                const addFriendUrl = searchInput.dataset.addUrl.replace("0", user.id);
+                const mutual = user.mutual_friends
+                    ? ` <small class="text-muted">${user.mutual_friends} mutual friend${user.mutual_friends === 1 ? "" : "s"}</small>`
+                    : "";
+
+                li.innerHTML = `
+                    <span>${user.username}${mutual}</span>
+                    <a href="${addFriendUrl}" class="btn btn-sm custom-btn">Add</a>
+                `;
+
+            resultsList.appendChild(li);
+          });
+        }
+    }
+
+    // People you may know, shown until the user types a search
+    async function showSuggestions() {
+        const response = await fetch(searchInput.dataset.suggestionsUrl);
+        const data = await response.json();
+        if (searchInput.value.trim().length < 2) {
+            showUsers(data, "No suggestions yet");
+        }
+    }
+
+    document.getElementById("addFriendModal").addEventListener("shown.bs.modal", showSuggestions);
+
+    searchInput.addEventListener("input", async function() {
+        const query = this.value.trim();
+        if (query.length < 2) {
+            showSuggestions();
+            return;
+        }
+
+        const response = await fetch(`${searchInput.dataset.searchUrl}?q=${encodeURIComponent(query)}`);
+        // Rate limited (429), the next keystroke tries again
+        if (!response.ok) return;
+        const data = await response.json();
+
+        if (this.value.trim() === query) {
+            showUsers(data, "No users found");
+        }
+    });
+});
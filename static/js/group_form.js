@@ -0,0 +1,105 @@
+document.addEventListener('DOMContentLoaded', function () {
+    const friendsList = document.getElementById('friends-list');
+    const selectedFriendsList = document.getElementById('selected-friends');
+    const hiddenSelect = document.getElementById('id_members');
+    const searchInput = document.getElementById('friend-search');
+    let query = '';
+    let page = 1;
+    let timer = null;
+
+    // Available friends come from the autocomplete endpoint a page at a time,
+    // members that are already selected are left out
+    async function loadFriends(more) {
+        const requested = query;
+        const requestedPage = more ? page + 1 : 1;
+        const response = await fetch(`${searchInput.dataset.url}?q=${encodeURIComponent(requested)}&page=${requestedPage}`);
+        const data = await response.json();
+        if (requested !== query) return;
+
+        page = requestedPage;
+        if (!more) friendsList.innerHTML = '';
+        friendsList.querySelector('.load-more')?.remove();
+
+        data.results.forEach(friend => {
+            if (hiddenSelect.querySelector(`option[value="${friend.id}"]`)) return;
+
+            const li = document.createElement('li');
+            li.classList.add('list-group-item', 'd-flex', 'justify-content-between', 'align-items-center');
+            li.dataset.id = friend.id;
+            li.innerHTML = `
+                <span></span>
+                <button type="button" class="btn btn-sm custom-btn add-friend">Add</button>
+            `;
+            li.querySelector('span').textContent = friend.label;
+            friendsList.appendChild(li);
+        });
+
+        if (data.has_more) {
+            const li = document.createElement('li');
+            li.classList.add('list-group-item', 'text-center');
+            li.innerHTML = '<button type="button" class="btn btn-sm custom-btn load-more">More…</button>';
+            friendsList.appendChild(li);
+        }
+    }
+
+    searchInput.addEventListener('input', function () {
+        clearTimeout(timer);
+        query = this.value.trim();
+        timer = setTimeout(() => loadFriends(false), 200);
+    });
+
+    searchInput.addEventListener('keydown', function (e) {
+        if (e.key === 'Enter') e.preventDefault();
+    });
+
+    loadFriends(false);
+
+    friendsList.addEventListener('click', function (e) {
+        if (e.target.classList.contains('load-more')) {
+            e.target.closest('li').remove();
+            loadFriends(true);
+        } else if (e.target.classList.contains('add-friend')) {
+            const li = e.target.closest('li');
+            const userId = li.dataset.id;
+            const username = li.querySelector('span').textContent;
+
+            const selectedItem = document.createElement('li');
+            selectedItem.classList.add('list-group-item', 'd-flex', 'justify-content-between', 'align-items-center');
+            selectedItem.dataset.id = userId;
+            selectedItem.innerHTML = `
+                <span>${username}</span>
+                <button type="button" class="btn btn-sm custom-btn remove-friend">Remove</button>
+            `;
+            selectedFriendsList.appendChild(selectedItem);
+
+            const option = document.createElement('option');
+            option.value = userId;
+            option.selected = true;
+            hiddenSelect.appendChild(option);
+
+            li.remove();
+        }
+    });
+
+    selectedFriendsList.addEventListener('click', function (e) {
+        if (e.target.classList.contains('remove-friend')) {
+            const li = e.target.closest('li');
+            const userId = li.dataset.id;
+            const username = li.querySelector('span').textContent;
+
+            li.remove();
+
+            const option = hiddenSelect.querySelector(`option[value="${userId}"]`);
+            if (option) option.remove();
+
+            const newLi = document.createElement('li');
+            newLi.classList.add('list-group-item', 'd-flex', 'justify-content-between', 'align-items-center');
+            newLi.dataset.id = userId;
+            newLi.innerHTML = `
+                <span>${username}</span>
+                <button type="button" class="btn btn-sm custom-btn add-friend">Add</button>
+            `;
+            friendsList.appendChild(newLi);
+        }
+    });
+});
@@ -0,0 +1,51 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const streamUrl = document.body.dataset.liveUrl;
+    const currentUser = Number(document.body.dataset.userId);
+    if (!streamUrl || !window.EventSource) return;
+
+    const labels = {
+        'invitation.created': notice => `New invitation: ${notice.title}`,
+        'invitation.status': notice => `${notice.title}: invitation ${notice.status}`,
+        'event.moved': notice => `${notice.title} was rescheduled`,
+    };
+
+    function showNotice(text) {
+        let container = document.querySelector('.messages-container');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'messages-container';
+            document.querySelector('.main-content').appendChild(container);
+        }
+
+        const alert = document.createElement('div');
+        alert.className = 'info alert fade show';
+        alert.setAttribute('role', 'alert');
+        alert.textContent = text;
+        container.appendChild(alert);
+
+        setTimeout(() => {
+            alert.style.transition = "opacity 0.5s";
+            alert.style.opacity = "0";
+            setTimeout(() => alert.remove(), 500);
+        }, 5000);
+    }
+
+    // Rows that only make sense while an invitation is pending carry data-pending-invitation
+    function patchPage(notice) {
+        if (notice.type === 'invitation.status' && notice.status !== 'pending') {
+            document.querySelectorAll(`[data-pending-invitation="${notice.invitation}"]`).forEach(el => el.remove());
+        }
+    }
+
+    const source = new EventSource(streamUrl);
+    Object.keys(labels).forEach(type => {
+        source.addEventListener(type, e => {
+            const notice = JSON.parse(e.data);
+            if (!(type === 'invitation.status' && notice.user === currentUser)) {
+                showNotice(labels[type](notice));
+            }
+            patchPage(notice);
+            document.dispatchEvent(new CustomEvent('calendar:notice', {detail: notice}));
+        });
+    });
+});
@@ -0,0 +1,102 @@
+// Autocomplete pickers for friends and groups, each chosen item is a chip
+// with a hidden input named after data-name
+document.addEventListener("DOMContentLoaded", function() {
+    document.querySelectorAll(".picker").forEach(function(picker) {
+        const input = picker.querySelector(".picker-input");
+        const results = picker.querySelector(".picker-results");
+        const selected = picker.querySelector(".picker-selected");
+        const multiple = picker.dataset.multiple === "true";
+        let query = "";
+        let page = 1;
+        let timer = null;
+
+        function choose(id, label) {
+            if (!multiple) {
+                selected.innerHTML = "";
+            } else if (selected.querySelector(`input[value="${id}"]`)) {
+                return;
+            }
+
+            const chip = document.createElement("span");
+            chip.classList.add("picker-chip");
+            chip.textContent = label;
+
+            const hidden = document.createElement("input");
+            hidden.type = "hidden";
+            hidden.name = picker.dataset.name;
+            hidden.value = id;
+
+            const remove = document.createElement("button");
+            remove.type = "button";
+            remove.classList.add("btn-close", "picker-remove");
+            remove.setAttribute("aria-label", "Remove");
+
+            chip.append(hidden, remove);
+            selected.appendChild(chip);
+        }
+
+        async function load(more) {
+            const requested = query;
+            const requestedPage = more ? page + 1 : 1;
+            const response = await fetch(`${picker.dataset.url}?q=${encodeURIComponent(requested)}&page=${requestedPage}`);
+            const data = await response.json();
+            if (requested !== query) {
+                return;
+            }
+
+            page = requestedPage;
+            if (!more) {
+                results.innerHTML = "";
+            }
+            results.querySelector(".picker-more")?.remove();
+
+            data.results.forEach(item => {
+                const li = document.createElement("li");
+                li.classList.add("list-group-item", "list-group-item-action", "picker-option");
+                li.dataset.id = item.id;
+                li.textContent = item.label;
+                results.appendChild(li);
+            });
+
+            if (data.has_more) {
+                const li = document.createElement("li");
+                li.classList.add("list-group-item", "list-group-item-action", "picker-more");
+                li.textContent = "More…";
+                results.appendChild(li);
+            }
+        }
+
+        input.addEventListener("input", function() {
+            clearTimeout(timer);
+            query = this.value.trim();
+            timer = setTimeout(() => load(false), 200);
+        });
+
+        input.addEventListener("focus", function() {
+            if (!results.children.length) {
+                load(false);
+            }
+        });
+
+        // Enter in the search box picks nothing and must not submit the form
+        input.addEventListener("keydown", function(e) {
+            if (e.key === "Enter") {
+                e.preventDefault();
+            }
+        });
+
+        results.addEventListener("click", function(e) {
+            if (e.target.classList.contains("picker-more")) {
+                load(true);
+            } else if (e.target.classList.contains("picker-option")) {
+                choose(e.target.dataset.id, e.target.textContent);
+            }
+        });
+
+        selected.addEventListener("click", function(e) {
+            if (e.target.classList.contains("picker-remove")) {
+                e.target.closest(".picker-chip").remove();
+            }
+        });
+    });
+});
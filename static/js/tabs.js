@@ -0,0 +1,18 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const tabButtons = document.querySelectorAll('.nav-tabs button[data-bs-toggle="tab"]');
+
+    const lastActiveTab = localStorage.getItem('activeTab');
+    if (lastActiveTab) {
+        const tab = document.querySelector(lastActiveTab);
+        if (tab) {
+            const bsTab = new bootstrap.Tab(tab);
+            bsTab.show();
+        }
+    }
+
+    tabButtons.forEach(btn => {
+        btn.addEventListener('shown.bs.tab', e => {
+            localStorage.setItem('activeTab', `#${e.target.id}`);
+        });
+    });
+});